@@ -7,6 +7,7 @@ from app.services.result_cache_service import ResultCacheService
 from app.services.analysis_result_service import AnalysisResultService
 import pandas as pd
 import numpy as np
+import orjson
 
 router = APIRouter()
 
@@ -155,7 +156,8 @@ async def recalculate_statistics_with_original_data(
 ):
     """Recalculate score statistics using original dataset for accurate valid percentages"""
     try:
-        # Load the cached results
+        # Load the cached results; statistics are computed from the full precision
+        # pickled scores rather than the float32 memory-mapped score matrix
         cached_df = cache_service.load_result_cache(analysis_id)
         if cached_df is None:
             raise HTTPException(status_code=404, detail="Cached analysis not found")
@@ -190,9 +192,8 @@ async def recalculate_statistics_with_original_data(
         stats_filename = f"stats_{analysis_id}.json"
         stats_path = cache_service.cache_dir / stats_filename
         
-        import json
-        with open(stats_path, 'w') as f:
-            json.dump(corrected_stats, f, indent=2)
+        with open(stats_path, 'wb') as f:
+            f.write(orjson.dumps(corrected_stats, option=orjson.OPT_SERIALIZE_NUMPY))
         
         return {
             "success": True,
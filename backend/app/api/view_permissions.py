@@ -186,9 +186,6 @@ async def create_user_view_permission(
     db.add(db_user_permission)
     db.commit()
     db.refresh(db_user_permission)
-    
-    # Load related data for response
-    db.refresh(db_user_permission)
     return db_user_permission
 
 @router.get("/user-permissions", response_model=List[UserViewPermissionResponse])
@@ -349,11 +346,14 @@ async def bulk_update_user_permissions(
             db.add(db_user_permission)
             created_permissions.append(db_user_permission)
     
+    # Flush to assign ids while the objects are still loaded, then commit
+    db.flush()
+    permission_ids = [permission.id for permission in created_permissions]
     db.commit()
     
-    # Refresh all permissions
-    for permission in created_permissions:
-        db.refresh(permission)
+    # Reload all permissions with one SELECT instead of refreshing each row
+    if permission_ids:
+        db.query(UserViewPermission).filter(UserViewPermission.id.in_(permission_ids)).all()
     
     return created_permissions
 
@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.types import TypeDecorator, CHAR
+from contextlib import contextmanager
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -49,4 +50,62 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# SQLite connection settings for one-off bulk loads and index builds: fewer fsyncs, a
+# large page cache, in-memory temp storage and memory-mapped I/O. They only last for the
+# connection, so pooled connections are reset with SQLITE_DEFAULT_PRAGMAS afterwards.
+SQLITE_BULK_PRAGMAS = [
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-262144",  # 256 MiB page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB memory-mapped I/O
+]
+
+SQLITE_DEFAULT_PRAGMAS = [
+    "PRAGMA synchronous=FULL",
+    "PRAGMA cache_size=-2000",
+    "PRAGMA temp_store=DEFAULT",
+    "PRAGMA mmap_size=0",
+]
+
+# WAL journaling, unlike the settings above, is stored in the database file and stays
+# in effect for every later connection
+SQLITE_WAL_PRAGMA = "PRAGMA journal_mode=WAL"
+
+
+def set_sqlite_pragmas(conn, pragmas):
+    """Apply SQLite pragmas on a SQLAlchemy connection; other backends are left untouched"""
+    if conn.dialect.name == "sqlite":
+        for pragma in pragmas:
+            conn.exec_driver_sql(pragma)
+        # End the implicit transaction so the caller can begin its own
+        conn.commit()
+
+
+@contextmanager
+def sqlite_migration_pragmas(conn):
+    """Migration-only SQLite speedups on a SQLAlchemy connection for the duration of the block.
+    
+    fsyncs are skipped and, unless the database uses WAL, the rollback journal is kept in
+    memory. The previous settings are restored on exit. Other backends are left untouched.
+    """
+    if conn.dialect.name != "sqlite":
+        yield
+        return
+    
+    previous_synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+    previous_journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    conn.exec_driver_sql("PRAGMA synchronous=OFF")
+    if previous_journal_mode != "wal":
+        conn.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+    conn.commit()
+    
+    try:
+        yield
+    finally:
+        conn.exec_driver_sql(f"PRAGMA synchronous={previous_synchronous}")
+        if previous_journal_mode != "wal":
+            conn.exec_driver_sql(f"PRAGMA journal_mode={previous_journal_mode}")
+        conn.commit()
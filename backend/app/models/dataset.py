@@ -1,6 +1,9 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Float, Boolean, JSON, Enum
+from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Float, Boolean, Enum, Index, LargeBinary
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from app.models.database import Base
+import numpy as np
+import json
 import uuid
 from datetime import datetime
 import enum
@@ -11,6 +14,28 @@ class DatasetType(enum.Enum):
     ANNOTATIONS = "annotations"
     RUBRIC = "rubric"
 
+# Numeric array stored as packed little-endian bytes instead of JSON text
+class PackedArrayType(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dtype, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dtype = np.dtype(dtype)
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        return np.asarray(value, dtype=self.dtype).tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        # Rows written before the switch to packed arrays hold JSON text
+        if isinstance(value, str):
+            return json.loads(value)
+        return np.frombuffer(value, dtype=self.dtype).tolist()
+
 class Dataset(Base):
     __tablename__ = "datasets"
     
@@ -81,6 +106,11 @@ class DatasetColumn(Base):
     # Relationships
     dataset = relationship("Dataset", back_populates="columns")
     histograms = relationship("DatasetHistogram", back_populates="column", cascade="all, delete-orphan")
+    
+    # Columns are looked up by dataset and type (e.g. numeric columns of a dataset)
+    __table_args__ = (
+        Index('ix_dataset_columns_dataset_type', 'dataset_id', 'column_type'),
+    )
 
 class DatasetHistogram(Base):
     __tablename__ = "dataset_histograms"
@@ -91,8 +121,8 @@ class DatasetHistogram(Base):
     
     # Histogram configuration
     bin_count = Column(Integer, nullable=False)  # Number of bins used
-    bin_edges = Column(JSON, nullable=False)  # Array of bin edge values
-    bin_counts = Column(JSON, nullable=False)  # Array of counts for each bin
+    bin_edges = Column(PackedArrayType('<f8'), nullable=False)  # Array of bin edge values
+    bin_counts = Column(PackedArrayType('<i8'), nullable=False)  # Array of counts for each bin
     
     # Histogram metadata
     min_value = Column(Float, nullable=False)  # Minimum value in the data
@@ -106,3 +136,8 @@ class DatasetHistogram(Base):
     # Relationships
     dataset = relationship("Dataset", back_populates="histograms")
     column = relationship("DatasetColumn", back_populates="histograms")
+    
+    # Same index name as created by migrate_histogram_table.py
+    __table_args__ = (
+        Index('idx_dataset_histograms_dataset_id', 'dataset_id'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, Boolean, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, String, Text, DateTime, Boolean, JSON, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 import uuid
@@ -75,6 +75,7 @@ class UserViewPermission(Base):
     # Ensure one permission record per user per view
     __table_args__ = (
         UniqueConstraint('user_id', 'view_permission_id', name='unique_user_view_permission'),
+        Index('ix_user_view_permissions_user_active', 'user_id', 'is_active'),
     )
 
 class PermissionGroup(Base):
@@ -135,4 +136,5 @@ class UserPermissionGroup(Base):
     # Ensure one group assignment per user per group
     __table_args__ = (
         UniqueConstraint('user_id', 'permission_group_id', name='unique_user_permission_group'),
+        Index('ix_user_permission_groups_user_active', 'user_id', 'is_active'),
     )
@@ -25,14 +25,8 @@ class AnalysisExecutor:
         
         # Execute individual rules
         for rule in individual_rules:
-            rule_scores = []
-            for _, row in dataset.iterrows():
-                row_dict = row.to_dict()
-                score = self.rule_engine.execute_rule(rule, row_dict)
-                rule_scores.append(score)
-            
             # Add rule scores as new column
-            results_df[f"{rule.name}_SCORE"] = rule_scores
+            results_df[f"{rule.name}_SCORE"] = self.rule_engine.apply_dataframe(rule, dataset)
         
         # Execute rubrics
         for rubric in rubrics:
@@ -49,7 +43,9 @@ class AnalysisExecutor:
         # Calculate total score
         score_columns = [col for col in results_df.columns if col.endswith('_SCORE')]
         if score_columns:
-            results_df['TOTAL_SCORE'] = results_df[score_columns].sum(axis=1, skipna=True)
+            # Direct NumPy row reduction; missing scores count as 0 like skipna=True
+            score_matrix = results_df[score_columns].to_numpy(dtype=np.float64, na_value=0.0)
+            results_df['TOTAL_SCORE'] = score_matrix.sum(axis=1)
             
             # Sort by total score (descending)
             results_df = results_df.sort_values('TOTAL_SCORE', ascending=False)
@@ -78,11 +74,12 @@ class AnalysisExecutor:
         rubric: Rubric, 
         dataset: pd.DataFrame,
         rubric_rules: List = None,
-        output_file: str = None
+        output_file: str = None,
+        top_n: int = None
     ) -> pd.DataFrame:
         """Execute a single rubric and create Excel output with two sheets"""
         # Execute rubric without weights
-        results_df = self.rubric_engine.execute_rubric_on_dataset_no_weights(rubric, dataset, rubric_rules)
+        results_df = self.rubric_engine.execute_rubric_on_dataset_no_weights(rubric, dataset, rubric_rules, top_n)
         
         if output_file:
             # Create Excel writer
@@ -107,13 +107,13 @@ class DatasetProcessor:
         """
         Calculate histogram for a numeric series
         """
-        # Convert to numeric, handling non-numeric values
-        numeric_series = pd.to_numeric(series, errors='coerce')
+        # Convert to a contiguous float64 array, handling non-numeric values
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
         
-        # Remove NaN values for histogram calculation
-        clean_series = numeric_series.dropna()
+        # Remove NaN (and infinite) values for histogram calculation
+        clean_values = values[np.isfinite(values)]
         
-        if len(clean_series) == 0:
+        if len(clean_values) == 0:
             # No valid numeric data
             return {
                 'bin_count': 0,
@@ -126,16 +126,16 @@ class DatasetProcessor:
             }
         
         # Calculate histogram
-        counts, bin_edges = np.histogram(clean_series, bins=bin_count)
+        counts, bin_edges = np.histogram(clean_values, bins=bin_count)
         
         return {
             'bin_count': len(counts),
             'bin_edges': bin_edges.tolist(),
             'bin_counts': counts.tolist(),
-            'min_value': float(clean_series.min()),
-            'max_value': float(clean_series.max()),
-            'total_count': len(clean_series),
-            'null_count': len(series) - len(clean_series)
+            'min_value': float(clean_values.min()),
+            'max_value': float(clean_values.max()),
+            'total_count': len(clean_values),
+            'null_count': len(series) - len(clean_values)
         }
     
     def generate_histograms_for_dataset(self, db: Session, dataset_id: str, bin_count: int = 30, 
@@ -157,41 +157,53 @@ class DatasetProcessor:
         
         numeric_columns = query.all()
         
-        histograms = []
-        for column in numeric_columns:
-            # Check if histogram already exists
-            existing_histogram = db.query(DatasetHistogram).filter(
-                DatasetHistogram.dataset_id == dataset_id,
-                DatasetHistogram.column_id == column.id
-            ).first()
-            
-            if existing_histogram:
-                # Skip if histogram already exists (unless force_regenerate is True)
-                continue
-            
-            # Get the column data
-            column_data = df[column.original_name]
-            
+        # Columns that already have a histogram, fetched once for the whole dataset
+        existing_histogram_columns = {
+            column_id for (column_id,) in db.query(DatasetHistogram.column_id).filter(
+                DatasetHistogram.dataset_id == dataset_id
+            )
+        }
+        
+        # Skip columns whose histogram already exists (unless force_regenerate is True)
+        columns = [
+            (column.id, column.original_name) for column in numeric_columns
+            if column.id not in existing_histogram_columns
+        ]
+        
+        return [
+            DatasetHistogram(**histogram_row)
+            for histogram_row in self.compute_histograms(dataset_id, columns, bin_count, df)
+        ]
+    
+    def compute_histograms(self, dataset_id: str, columns: List[Tuple[str, str]], bin_count: int = 30,
+                           df: Optional[pd.DataFrame] = None) -> List[Dict[str, Any]]:
+        """
+        Compute histogram rows for (column_id, original_name) pairs of a dataset.
+        Does not touch the database and returns plain dicts, so it can run in worker processes.
+        """
+        if df is None:
+            df = self.load_dataset(dataset_id)
+        
+        histogram_rows = []
+        for column_id, original_name in columns:
             # Calculate histogram
-            histogram_data = self.calculate_histogram(column_data, bin_count)
+            histogram_data = self.calculate_histogram(df[original_name], bin_count)
             
             # Create histogram record
-            histogram = DatasetHistogram(
-                id=uuid.uuid4().hex,
-                dataset_id=dataset_id,
-                column_id=column.id,
-                bin_count=histogram_data['bin_count'],
-                bin_edges=histogram_data['bin_edges'],
-                bin_counts=histogram_data['bin_counts'],
-                min_value=histogram_data['min_value'],
-                max_value=histogram_data['max_value'],
-                total_count=histogram_data['total_count'],
-                null_count=histogram_data['null_count']
-            )
-            
-            histograms.append(histogram)
-        
-        return histograms
+            histogram_rows.append({
+                'id': uuid.uuid4().hex,
+                'dataset_id': dataset_id,
+                'column_id': column_id,
+                'bin_count': histogram_data['bin_count'],
+                'bin_edges': histogram_data['bin_edges'],
+                'bin_counts': histogram_data['bin_counts'],
+                'min_value': histogram_data['min_value'],
+                'max_value': histogram_data['max_value'],
+                'total_count': histogram_data['total_count'],
+                'null_count': histogram_data['null_count']
+            })
+        
+        return histogram_rows
     
     def process_file(self, file_path: str, dataset_info: DatasetCreate) -> Tuple[Dataset, List[DatasetColumn]]:
         """
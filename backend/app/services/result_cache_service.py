@@ -6,6 +6,10 @@ from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 import json
+import orjson
+
+CACHE_WRITE_BUFFER_SIZE = 1 << 20
+CACHE_PICKLE_PROTOCOL = 5
 
 class ResultCacheService:
     """Service for caching analysis results and score statistics for fast access"""
@@ -19,6 +23,7 @@ class ResultCacheService:
         
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
+        self._rule_input_columns = None
         print(f"ResultCacheService initialized with cache directory: {self.cache_dir.absolute()}")
     
     def create_optimized_result_cache(
@@ -48,14 +53,19 @@ class ResultCacheService:
             all_columns = list(set(key_columns + score_columns + scoring_columns))
             available_columns = [col for col in all_columns if col in results_df.columns]
             
+            # Score columns stay float64, so the pickle, statistics and histograms keep
+            # full precision
             optimized_df = results_df[available_columns].copy()
-            
+
             # Save optimized pickle file
             pickle_filename = f"res_{analysis_id}.pkl"
             pickle_path = self.cache_dir / pickle_filename
             
-            with open(pickle_path, 'wb') as f:
-                pickle.dump(optimized_df, f)
+            # A 1 MiB buffer keeps multi-MB pickles from being written in 8 KiB syscalls.
+            # Protocol 5 streams NumPy column buffers straight into the file instead of
+            # first copying each one into an intermediate bytes object.
+            with open(pickle_path, 'wb', buffering=CACHE_WRITE_BUFFER_SIZE) as f:
+                pickle.dump(optimized_df, f, protocol=CACHE_PICKLE_PROTOCOL)
             
             # Calculate and cache score statistics
             score_stats = self._calculate_score_statistics(optimized_df, score_columns)
@@ -67,20 +77,21 @@ class ResultCacheService:
             stats_filename = f"stats_{analysis_id}.json"
             stats_path = self.cache_dir / stats_filename
             
-            with open(stats_path, 'w') as f:
-                json.dump(score_stats, f, indent=2, default=str)
+            with open(stats_path, 'wb') as f:
+                f.write(orjson.dumps(score_stats, option=orjson.OPT_SERIALIZE_NUMPY))
             
             # Save histograms cache
             histograms_filename = f"histograms_{analysis_id}.json"
             histograms_path = self.cache_dir / histograms_filename
             
-            with open(histograms_path, 'w') as f:
-                json.dump(histograms, f, indent=2, default=str)
+            with open(histograms_path, 'wb') as f:
+                f.write(orjson.dumps(histograms, option=orjson.OPT_SERIALIZE_NUMPY))
             
             # Create cache metadata
             cache_metadata = {
                 "analysis_id": analysis_id,
-                "created_at": datetime.utcnow().isoformat(),
+                # Kept as a datetime: orjson writes it natively in isoformat() form
+                "created_at": datetime.utcnow(),
                 "pickle_file": str(pickle_path),
                 "stats_file": str(stats_path),
                 "histograms_file": str(histograms_path),
@@ -89,7 +100,9 @@ class ResultCacheService:
                     "key_columns": key_columns,
                     "score_columns": score_columns,
                     "scoring_columns": scoring_columns,
-                    "available_columns": available_columns
+                    "available_columns": available_columns,
+                    # Column dtypes, so consumers can inspect the cached columns without loading data
+                    "dtypes": {col: str(dtype) for col, dtype in optimized_df.dtypes.items()}
                 },
                 "file_size_mb": pickle_path.stat().st_size / (1024 * 1024)
             }
@@ -98,8 +111,9 @@ class ResultCacheService:
             metadata_filename = f"meta_{analysis_id}.json"
             metadata_path = self.cache_dir / metadata_filename
             
-            with open(metadata_path, 'w') as f:
-                json.dump(cache_metadata, f, indent=2, default=str)
+            # Metadata is human-read, so keep it indented
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps(cache_metadata, option=orjson.OPT_INDENT_2))
             
             return cache_metadata
             
@@ -111,22 +125,16 @@ class ResultCacheService:
         stats = {}
         
         # Get rule information to map score columns to their input columns
-        from app.models.database import get_db
-        from app.models.rule import Rule
+        rule_input_columns = self._get_rule_input_columns()
         
-        db = next(get_db())
-        rules = db.query(Rule).filter(Rule.is_active == True).all()
-        rule_mapping = {rule.name: rule for rule in rules}
+        # Valid-row counts keyed by input column set; rules sharing inputs reuse one scan
+        valid_count_cache: Dict[frozenset, int] = {}
+        original_total_rows = len(original_df)
         
-        for col in score_columns:
-            if col not in df.columns:
-                continue
-                
-            # Get valid (non-null) values from processed results
-            valid_values = df[col].dropna()
-            total_rows = len(df)
-            valid_count = len(valid_values)
-            
+        # Aggregate all score columns in one vectorized pass
+        score_aggregates = self._aggregate_score_columns(df, score_columns)
+        
+        for col, aggregates in score_aggregates.items():
             # Calculate valid percentage based on rule's input columns
             valid_percentage = 100.0  # Default to 100%
             null_count = 0
@@ -134,61 +142,57 @@ class ResultCacheService:
             
             if col.endswith('_SCORE'):
                 rule_name = col.replace('_SCORE', '')
-                if rule_name in rule_mapping:
-                    rule = rule_mapping[rule_name]
-                    if rule.column_mapping:
-                        # Get the columns this rule depends on
-                        input_columns = list(rule.column_mapping.values())
-                        available_input_columns = [col for col in input_columns if col in original_df.columns]
-                        
-                        if available_input_columns:
-                            # Calculate valid percentage based on rows where ALL input columns are non-null
+                if rule_name in rule_input_columns:
+                    # Get the columns this rule depends on
+                    input_columns = rule_input_columns[rule_name]
+                    available_input_columns = [col for col in input_columns if col in original_df.columns]
+                    
+                    if available_input_columns:
+                        # Calculate valid percentage based on rows where ALL input columns are non-null
+                        cache_key = frozenset(available_input_columns)
+                        if cache_key not in valid_count_cache:
                             valid_rows = original_df[available_input_columns].notna().all(axis=1)
-                            original_valid_count = int(valid_rows.sum())
-                            original_total_rows = len(original_df)
-                            valid_percentage = round((original_valid_count / original_total_rows) * 100, 2)
-                            null_count = original_total_rows - original_valid_count
-                            null_percentage = round((null_count / original_total_rows) * 100, 2)
+                            valid_count_cache[cache_key] = int(valid_rows.sum())
+                        
+                        original_valid_count = valid_count_cache[cache_key]
+                        valid_percentage = round((original_valid_count / original_total_rows) * 100, 2)
+                        null_count = original_total_rows - original_valid_count
+                        null_percentage = round((null_count / original_total_rows) * 100, 2)
             
-            if valid_count == 0:
-                stats[col] = {
-                    "count": 0,
-                    "valid_percentage": valid_percentage,
-                    "min": None,
-                    "max": None,
-                    "mean": None,
-                    "median": None,
-                    "std": None,
-                    "null_count": null_count,
-                    "null_percentage": null_percentage
-                }
-            else:
-                stats[col] = {
-                    "count": valid_count,
-                    "valid_percentage": valid_percentage,
-                    "min": float(valid_values.min()),
-                    "max": float(valid_values.max()),
-                    "mean": float(valid_values.mean()),
-                    "median": float(valid_values.median()),
-                    "std": float(valid_values.std()) if len(valid_values) > 1 else 0.0,
-                    "null_count": null_count,
-                    "null_percentage": null_percentage
-                }
+            stats[col] = self._build_score_stats_entry(aggregates, valid_percentage, null_count, null_percentage)
         
         return stats
+    
+    def _get_rule_input_columns(self) -> Dict[str, List[str]]:
+        """Map active rule names to their input columns, queried once per service instance"""
+        if self._rule_input_columns is None:
+            from app.models.database import SessionLocal
+            from app.models.rule import Rule
+            
+            db = SessionLocal()
+            try:
+                rules = db.query(Rule.name, Rule.column_mapping).filter(Rule.is_active == True).all()
+            finally:
+                db.close()
+            
+            self._rule_input_columns = {
+                name: list((column_mapping or {}).values())
+                for name, column_mapping in rules
+            }
+        
+        return self._rule_input_columns
 
     def _calculate_score_statistics(self, df: pd.DataFrame, score_columns: List[str], original_df: pd.DataFrame = None) -> Dict[str, Any]:
         """Calculate comprehensive score statistics for all score columns"""
         stats = {}
         
-        for col in score_columns:
-            if col not in df.columns:
-                continue
-                
-            # Get valid (non-null) values from processed results
-            valid_values = df[col].dropna()
-            total_rows = len(df)
-            valid_count = len(valid_values)
+        total_rows = len(df)
+        
+        # Aggregate all score columns in one vectorized pass
+        score_aggregates = self._aggregate_score_columns(df, score_columns)
+        
+        for col, aggregates in score_aggregates.items():
+            valid_count = aggregates["count"]
             
             # Calculate valid percentage based on original data if available
             if original_df is not None:
@@ -221,33 +225,60 @@ class ResultCacheService:
                 null_count = total_rows - valid_count
                 null_percentage = round((null_count / total_rows) * 100, 2)
             
-            if valid_count == 0:
-                stats[col] = {
-                    "count": 0,
-                    "valid_percentage": valid_percentage,
-                    "min": None,
-                    "max": None,
-                    "mean": None,
-                    "median": None,
-                    "std": None,
-                    "null_count": null_count,
-                    "null_percentage": null_percentage
-                }
-            else:
-                stats[col] = {
-                    "count": valid_count,
-                    "valid_percentage": valid_percentage,
-                    "min": float(valid_values.min()),
-                    "max": float(valid_values.max()),
-                    "mean": float(valid_values.mean()),
-                    "median": float(valid_values.median()),
-                    "std": float(valid_values.std()) if len(valid_values) > 1 else 0.0,
-                    "null_count": null_count,
-                    "null_percentage": null_percentage
-                }
+            stats[col] = self._build_score_stats_entry(aggregates, valid_percentage, null_count, null_percentage)
         
         return stats
     
+    def _aggregate_score_columns(self, df: pd.DataFrame, score_columns: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Compute count/min/max/mean/median/std for all score columns with a single DataFrame.agg call"""
+        available_score_columns = [col for col in score_columns if col in df.columns]
+        if not available_score_columns:
+            return {}
+        
+        # NaNs are skipped by every aggregation, matching the previous per-column dropna()
+        agg_df = df[available_score_columns].agg(['count', 'min', 'max', 'mean', 'median', 'std'])
+        aggregates = agg_df.astype(float).to_dict()
+        
+        for col_aggregates in aggregates.values():
+            col_aggregates["count"] = int(col_aggregates["count"])
+        
+        return aggregates
+    
+    def _build_score_stats_entry(
+        self,
+        aggregates: Dict[str, Any],
+        valid_percentage: float,
+        null_count: int,
+        null_percentage: float
+    ) -> Dict[str, Any]:
+        """Pack pre-computed aggregates into the cached statistics format"""
+        valid_count = aggregates["count"]
+        
+        if valid_count == 0:
+            return {
+                "count": 0,
+                "valid_percentage": valid_percentage,
+                "min": None,
+                "max": None,
+                "mean": None,
+                "median": None,
+                "std": None,
+                "null_count": null_count,
+                "null_percentage": null_percentage
+            }
+        
+        return {
+            "count": valid_count,
+            "valid_percentage": valid_percentage,
+            "min": aggregates["min"],
+            "max": aggregates["max"],
+            "mean": aggregates["mean"],
+            "median": aggregates["median"],
+            "std": aggregates["std"] if valid_count > 1 else 0.0,
+            "null_count": null_count,
+            "null_percentage": null_percentage
+        }
+    
     def _calculate_score_histograms(self, df: pd.DataFrame, score_columns: List[str]) -> Dict[str, Any]:
         """Calculate histograms for all score columns"""
         histograms = {}
@@ -256,13 +287,13 @@ class ResultCacheService:
             if col not in df.columns:
                 continue
                 
-            # Get valid (non-null, non-infinite) values
-            valid_values = df[col].dropna()
-            valid_values = valid_values[np.isfinite(valid_values)]
+            # Get valid (non-null, non-infinite) values. Edges are computed in float64;
+            # widening does not undo float32 rounding, so the cached scores stay float64
+            values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid_values = values[np.isfinite(values)]
             
             if len(valid_values) == 0:
                 histograms[col] = {
-                    "bins": [],
                     "counts": [],
                     "bin_edges": [],
                     "valid_count": 0,
@@ -274,13 +305,13 @@ class ResultCacheService:
                     # Use Sturges' rule: bins = ceil(log2(n)) + 1, but cap at 50 for performance
                     n_bins = min(50, max(10, int(np.ceil(np.log2(len(valid_values))) + 1)))
                     
-                    counts, bin_edges = np.histogram(valid_values, bins=n_bins)
+                    bin_edges = np.histogram_bin_edges(valid_values, bins=n_bins)
+                    counts = self._bin_counts(valid_values, bin_edges)
                     
-                    # Convert to JSON-serializable format
+                    # NumPy arrays are serialized natively by orjson
                     histograms[col] = {
-                        "bins": [float(x) for x in bin_edges[:-1]],  # Left edges of bins
-                        "counts": [int(x) for x in counts],
-                        "bin_edges": [float(x) for x in bin_edges],
+                        "counts": counts,
+                        "bin_edges": bin_edges,
                         "valid_count": len(valid_values),
                         "total_count": len(df),
                         "bin_width": float(bin_edges[1] - bin_edges[0]) if len(bin_edges) > 1 else 0.0
@@ -288,7 +319,6 @@ class ResultCacheService:
                 except Exception as e:
                     print(f"Warning: Could not calculate histogram for column {col}: {e}")
                     histograms[col] = {
-                        "bins": [],
                         "counts": [],
                         "bin_edges": [],
                         "valid_count": 0,
@@ -298,6 +328,24 @@ class ResultCacheService:
         
         return histograms
     
+    def _bin_counts(self, values: np.ndarray, bin_edges: np.ndarray) -> np.ndarray:
+        """Count values into uniform bins with one index computation per value.
+        
+        Bin indices come straight from (value - lo) / width instead of a binary search
+        over the edges; values that rounding puts on the wrong side of an edge are moved
+        by one bin. The last bin includes its right edge, as with np.histogram.
+        """
+        n_bins = len(bin_edges) - 1
+        lo, hi = bin_edges[0], bin_edges[-1]
+        
+        bin_indices = ((values - lo) * (n_bins / (hi - lo))).astype(np.intp)
+        np.clip(bin_indices, 0, n_bins - 1, out=bin_indices)
+        
+        bin_indices[values < bin_edges[bin_indices]] -= 1
+        bin_indices[(values >= bin_edges[bin_indices + 1]) & (bin_indices != n_bins - 1)] += 1
+        
+        return np.bincount(bin_indices, minlength=n_bins)
+    
     def load_result_cache(self, analysis_id: str) -> Optional[pd.DataFrame]:
         """Load optimized result DataFrame from cache"""
         pickle_filename = f"res_{analysis_id}.pkl"
@@ -1,10 +1,52 @@
-from typing import Dict, List, Any, Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Any, NamedTuple, Tuple, Union
 import pandas as pd
+import numpy as np
+import os
 from app.models.rubric import Rubric
 from app.models.rubric_rule import RubricRule
 from app.models.rule import Rule
 from app.services.rule_engine import RuleEngine
 
+class RuleSnapshot(NamedTuple):
+    """Plain copy of the Rule fields used for scoring, read once from the ORM object"""
+    id: Any
+    name: str
+    column_mapping: Dict[str, str]
+    ruleset_conditions: Tuple[str, ...]
+
+def _snapshot_rule(rule: Rule) -> tuple:
+    """Hashable (id, name, column_mapping items, ruleset_conditions) copy of a rule"""
+    return (
+        rule.id,
+        rule.name,
+        tuple((rule.column_mapping or {}).items()),
+        tuple(rule.ruleset_conditions or ())
+    )
+
+@lru_cache(maxsize=256)
+def _compile_rubric(rule_snapshots: tuple) -> tuple:
+    """Resolve a rubric's rules once into (rules, input_columns).
+    
+    rules holds a RuleSnapshot per rule, in rubric order; input_columns lists the
+    dataset columns referenced by any rule, in first-use order. Cached by rule
+    content, so every engine instance shares them and edited rules recompile.
+    """
+    rules = tuple(
+        RuleSnapshot(rule_id, name, dict(column_mapping), conditions)
+        for rule_id, name, column_mapping, conditions in rule_snapshots
+    )
+    
+    input_columns = []
+    for rule in rules:
+        for column_path in rule.column_mapping.values():
+            column_name = column_path.split(".")[-1]
+            if column_name not in input_columns:
+                input_columns.append(column_name)
+    
+    return rules, tuple(input_columns)
+
 class RubricEngine:
     def __init__(self):
         self.rule_engine = RuleEngine()
@@ -85,10 +127,98 @@ class RubricEngine:
             result["error"] = str(e)
             return result
     
+    def _compile(self, rubric: Rubric, active_rules: List) -> Callable[[pd.DataFrame], Dict[str, np.ndarray]]:
+        """Compile a rubric's active rules into one reusable dataset scorer.
+        
+        Rule order, output column names and referenced input columns are resolved once
+        per distinct set of rules (see _compile_rubric). The scorer returns raw per-rule
+        score arrays keyed by score column name.
+        """
+        rules, input_columns = _compile_rubric(tuple(_snapshot_rule(rr.rule) for rr in active_rules))
+        
+        def scorer(dataset: pd.DataFrame) -> Dict[str, np.ndarray]:
+            # Extract the columns used by the rubric once, shared by all rules
+            column_data = self._extract_rule_columns(list(input_columns), dataset)
+            
+            # Workers only see the plain rule snapshots and never log; callers report
+            # progress in rule order once every rule is scored
+            def score_rule(rule: RuleSnapshot) -> np.ndarray:
+                return self.rule_engine.execute_rule_vectorized(rule, dataset, column_data)
+            
+            # Rules are independent, and their column work runs in NumPy code that
+            # releases the GIL, so score them concurrently
+            if len(rules) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(rules), os.cpu_count() or 1)) as executor:
+                    rule_scores = list(executor.map(score_rule, rules))
+            else:
+                rule_scores = [score_rule(rule) for rule in rules]
+            
+            return {f"{rule.name}_SCORE": scores for rule, scores in zip(rules, rule_scores)}
+        
+        return scorer
+    
+    def _extract_rule_columns(self, input_columns: List[str], dataset: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Extract the given dataset columns once so every rule in a rubric can share them.
+        
+        Column names are resolved to integer positions in one get_indexer call and the
+        data is sliced by position. Numeric columns are converted together into a single
+        contiguous float64 block (NaN for missing values) and handed out as per-column
+        views; other columns are passed through unchanged. All columns are positionally
+        indexed.
+        """
+        positions = dataset.columns.get_indexer(input_columns)
+        found = [(name, position) for name, position in zip(input_columns, positions) if position >= 0]
+        dtypes = dataset.dtypes
+        
+        numeric = [
+            (name, position) for name, position in found
+            if pd.api.types.is_numeric_dtype(dtypes.iloc[position]) and not pd.api.types.is_bool_dtype(dtypes.iloc[position])
+        ]
+        index = pd.RangeIndex(len(dataset))
+        column_data = {}
+        
+        if numeric:
+            block = np.asfortranarray(
+                dataset.iloc[:, [position for _, position in numeric]].to_numpy(dtype=np.float64, na_value=np.nan)
+            )
+            for offset, (name, _) in enumerate(numeric):
+                column_data[name] = pd.Series(block[:, offset], index=index, copy=False)
+        
+        for name, position in found:
+            if name not in column_data:
+                column_data[name] = dataset.iloc[:, position].reset_index(drop=True)
+        
+        return column_data
+    
+    def _join_score_columns(self, dataset: pd.DataFrame, score_columns: Dict[str, Any]) -> pd.DataFrame:
+        """Append score columns to the dataset with one concat instead of copying it up front"""
+        # Score columns replace any dataset columns of the same name
+        overlapping_columns = [col for col in score_columns if col in dataset.columns]
+        if overlapping_columns:
+            dataset = dataset.drop(columns=overlapping_columns)
+        
+        scores_df = pd.DataFrame(score_columns, index=dataset.index)
+        return pd.concat([dataset, scores_df], axis=1, copy=False)
+    
+    def _sort_by_total_score(self, results_df: pd.DataFrame, total_column: str, top_n: int = None) -> pd.DataFrame:
+        """Sort rows by total score (descending), optionally keeping only the top_n rows"""
+        if top_n is None or top_n >= len(results_df):
+            return results_df.sort_values(total_column, ascending=False)
+        
+        if top_n <= 0:
+            return results_df.iloc[:0]
+        
+        # Select the top_n rows in O(N) and only sort those
+        totals = results_df[total_column].to_numpy(dtype=np.float64)
+        top_positions = np.argpartition(-totals, top_n - 1)[:top_n]
+        top_positions = top_positions[np.argsort(-totals[top_positions], kind='stable')]
+        
+        return results_df.iloc[top_positions]
+    
     def execute_rubric_on_dataset(self, rubric: Rubric, dataset: pd.DataFrame) -> pd.DataFrame:
         """Execute a complete rubric on an entire dataset"""
-        # Create a copy to avoid modifying original
-        results_df = dataset.copy()
+        # Collect new columns separately; the dataset itself is never copied or modified
+        score_columns = {}
         
         # Get all active rules in the rubric
         active_rules = [
@@ -99,36 +229,42 @@ class RubricEngine:
         # Sort by order_index
         active_rules.sort(key=lambda x: x.order_index)
         
-        # Execute each rule and store individual scores
-        for rubric_rule in active_rules:
-            rule_scores = []
-            for _, row in dataset.iterrows():
-                row_dict = row.to_dict()
-                rule_score = self.rule_engine.execute_rule(rubric_rule.rule, row_dict)
-                rule_scores.append(rule_score)
-            
-            # Add individual rule scores as new column
-            results_df[f"{rubric_rule.rule.name}_SCORE"] = rule_scores
+        # Score every rule column-wise with the compiled rubric
+        score_columns.update(self._compile(rubric, active_rules)(dataset))
         
-        # Calculate weighted total score
-        total_scores = []
-        for _, row in dataset.iterrows():
-            row_dict = row.to_dict()
-            total_score = self.execute_rubric(rubric, row_dict)
-            total_scores.append(total_score)
+        # Calculate weighted total score from the stored rule scores; missing scores count as 0
+        if active_rules:
+            score_matrix = np.column_stack([
+                pd.to_numeric(pd.Series(score_columns[f"{rr.rule.name}_SCORE"]), errors='coerce').to_numpy(dtype=np.float64, na_value=0.0)
+                for rr in active_rules
+            ])
+            weights = np.array([rr.weight for rr in active_rules], dtype=np.float64)
+            total_scores = score_matrix @ weights
+        else:
+            total_scores = np.zeros(len(dataset))
         
         # Add total rubric score
-        results_df[f"{rubric.name}_RUBRIC_SCORE"] = total_scores
+        score_columns[f"{rubric.name}_RUBRIC_SCORE"] = total_scores
+        results_df = self._join_score_columns(dataset, score_columns)
         
         # Sort by total score (descending)
         results_df = results_df.sort_values(f"{rubric.name}_RUBRIC_SCORE", ascending=False)
         
         return results_df
     
-    def execute_rubric_on_dataset_no_weights(self, rubric: Rubric, dataset: pd.DataFrame, rubric_rules: List = None) -> pd.DataFrame:
-        """Execute a complete rubric on an entire dataset WITHOUT weights - just sum individual rule scores"""
-        # Create a copy to avoid modifying original
-        results_df = dataset.copy()
+    def execute_rubric_on_dataset_no_weights(
+        self,
+        rubric: Rubric,
+        dataset: pd.DataFrame,
+        rubric_rules: List = None,
+        top_n: int = None
+    ) -> pd.DataFrame:
+        """Execute a complete rubric on an entire dataset WITHOUT weights - just sum individual rule scores.
+        
+        If top_n is given, only the top_n highest scoring rows are returned.
+        """
+        # Collect new columns separately; the dataset itself is never copied or modified
+        score_columns: Dict[str, np.ndarray] = {}
         
         # Use provided rubric_rules or try to get from rubric object
         if rubric_rules is None:
@@ -139,8 +275,7 @@ class RubricEngine:
                 ]
             else:
                 # If no rubric_rules provided and not loaded, return empty scores
-                results_df[f"{rubric.name}_RUBRIC_SCORE"] = [0.0] * len(dataset)
-                return results_df
+                return self._join_score_columns(dataset, {f"{rubric.name}_RUBRIC_SCORE": np.zeros(len(dataset))})
         else:
             active_rules = [
                 rr for rr in rubric_rules 
@@ -152,34 +287,34 @@ class RubricEngine:
         
         print(f"Executing rubric '{rubric.name}' with {len(active_rules)} active rules")
         
-        # Execute each rule and store individual scores
+        # Score the whole dataset column-wise with the compiled rubric
+        rule_scores_by_column = self._compile(rubric, active_rules)(dataset)
+        
         for rubric_rule in active_rules:
-            rule_scores = []
             print(f"Executing rule: {rubric_rule.rule.name}")
             
-            for _, row in dataset.iterrows():
-                row_dict = row.to_dict()
-                rule_score = self.rule_engine.execute_rule(rubric_rule.rule, row_dict)
-                if rule_score is None or pd.isna(rule_score):
-                    rule_score = 0.0
-                rule_scores.append(rule_score)
+            # Missing scores count as 0
+            score_column = f"{rubric_rule.rule.name}_SCORE"
+            rule_scores = rule_scores_by_column[score_column]
+            rule_scores = np.where(pd.isna(rule_scores), 0.0, rule_scores)
             
             # Add individual rule scores as new column
-            results_df[f"{rubric_rule.rule.name}_SCORE"] = rule_scores
-            print(f"Rule {rubric_rule.rule.name} completed. Sample scores: {rule_scores[:5]}")
+            score_columns[score_column] = rule_scores
+            print(f"Rule {rubric_rule.rule.name} completed. Sample scores: {rule_scores[:5].tolist()}")
         
         # Calculate total score by summing all individual rule scores (NO WEIGHTS)
-        score_columns = [col for col in results_df.columns if col.endswith('_SCORE') and not col.endswith('_RUBRIC_SCORE')]
-        print(f"Score columns for total calculation: {score_columns}")
+        print(f"Score columns for total calculation: {list(score_columns)}")
         
         if score_columns:
             # Sum all individual rule scores for each row
-            results_df[f"{rubric.name}_RUBRIC_SCORE"] = results_df[score_columns].sum(axis=1, skipna=True)
+            score_columns[f"{rubric.name}_RUBRIC_SCORE"] = np.stack(list(score_columns.values())).sum(axis=0)
         else:
-            results_df[f"{rubric.name}_RUBRIC_SCORE"] = [0.0] * len(dataset)
+            score_columns[f"{rubric.name}_RUBRIC_SCORE"] = np.zeros(len(dataset))
+        
+        results_df = self._join_score_columns(dataset, score_columns)
         
         # Sort by total score (descending)
-        results_df = results_df.sort_values(f"{rubric.name}_RUBRIC_SCORE", ascending=False)
+        results_df = self._sort_by_total_score(results_df, f"{rubric.name}_RUBRIC_SCORE", top_n)
         
         print(f"Rubric execution completed. Total score range: {results_df[f'{rubric.name}_RUBRIC_SCORE'].min()} to {results_df[f'{rubric.name}_RUBRIC_SCORE'].max()}")
         
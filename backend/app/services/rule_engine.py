@@ -1,119 +1,405 @@
-import pandas as pd
-import numpy as np
-from typing import Dict, List, Any, Union
+import ast
+import io
+import logging
+import tokenize
+import math
+from functools import lru_cache
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, List, Any, Union
 from app.models.rule import Rule
 
+# pandas and NumPy are only needed by the vectorized paths and are imported there, so
+# importing the engine for row-wise scoring does not load them
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Names available to compiled conditions; row values are passed separately as locals
+CONDITION_GLOBALS = {
+    '__builtins__': {},
+    'True': True,
+    'False': False,
+    'TRUE': True,
+    'FALSE': False,
+    'true': True,
+    'false': False,
+    'nan': float('nan'),
+    'float': float,
+    'int': int,
+    'abs': abs,
+    'min': min,
+    'max': max
+}
+
+# R logical operators and the Python keywords they translate to
+R_LOGICAL_OPERATORS = {'&': 'and', '|': 'or'}
+
+# R logical constants, folded into the compiled condition
+R_CONSTANTS = {'TRUE': True, 'FALSE': False}
+
+class _RConstantTransformer(ast.NodeTransformer):
+    """Replace references to R's TRUE/FALSE with constants"""
+    
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if isinstance(node.ctx, ast.Load) and node.id in R_CONSTANTS:
+            return ast.copy_location(ast.Constant(R_CONSTANTS[node.id]), node)
+        return node
+
+def _translate_r_expr(expr: str) -> ast.Expression:
+    """Translate an R-style condition into a Python expression tree in one pass.
+    
+    & and | are rewritten to and/or at the token level, which keeps R's precedence
+    (they bind looser than comparisons) and leaves string literals untouched.
+    """
+    try:
+        tokens = [
+            (tokenize.NAME, R_LOGICAL_OPERATORS[token.string])
+            if token.type == tokenize.OP and token.string in R_LOGICAL_OPERATORS
+            else (token.type, token.string)
+            for token in tokenize.generate_tokens(io.StringIO(expr.strip()).readline)
+        ]
+    except tokenize.TokenError as e:
+        raise SyntaxError(f"invalid condition: {e.args[0]}") from e
+    
+    tree = ast.parse(tokenize.untokenize(tokens), mode="eval")
+    return ast.fix_missing_locations(_RConstantTransformer().visit(tree))
+
+@lru_cache(maxsize=4096)
+def _condition_constant(condition: str) -> Union[bool, None]:
+    """Return the value of a condition that is a constant such as TRUE, else None"""
+    try:
+        body = _translate_r_expr(condition).body
+    except SyntaxError:
+        return None
+    return bool(body.value) if isinstance(body, ast.Constant) else None
+
+def _is_missing(value: Any) -> bool:
+    """Whether a row value is missing (None or NaN), checking plain floats and strings first"""
+    if value is None:
+        return True
+    if isinstance(value, float):
+        # NaN is the only float that is not equal to itself
+        return value != value
+    if isinstance(value, (str, int)):
+        return False
+    # Other types such as pd.NA, NaT or NumPy scalars
+    import pandas as pd
+    return bool(pd.isna(value))
+
+@lru_cache(maxsize=4096)
+def _parse_condition(condition: str) -> tuple:
+    """Parse a condition string into condition and score parts; pure, so memoized"""
+    if "~" in condition:
+        condition_part, score_part = condition.split("~", 1)
+        condition_part = condition_part.strip()
+        score_part = score_part.strip()
+        
+        # Remove extra quotes if present
+        if condition_part.startswith('"') and condition_part.endswith('"'):
+            condition_part = condition_part[1:-1]
+        if score_part.startswith('"') and score_part.endswith('"'):
+            score_part = score_part[1:-1]
+        
+        # Handle NA_real_ case
+        if score_part == "NA_real_":
+            score = math.nan
+        else:
+            try:
+                score = float(score_part)
+            except ValueError:
+                score = score_part
+        
+        return condition_part, score
+    else:
+        raise ValueError(f"Invalid condition format: {condition}")
+
+@lru_cache(maxsize=4096)
+def _compile_condition(condition: str):
+    """Translate an R-style condition to Python and compile it to a code object"""
+    return compile(_translate_r_expr(condition), "<rule>", "eval")
+
+@lru_cache(maxsize=1024)
+def _compile_rule_conditions(conditions: tuple, var_names: frozenset) -> tuple:
+    """Compile a rule's conditions once into ((condition, code, score, variables), ...), default_score.
+    
+    Each condition is translated to Python and compiled to a code object that reads
+    the rule's variables from the eval namespace, so rows are never substituted
+    into the condition text. variables lists the mapped variables a condition uses.
+    A TRUE catch-all ends the list: its score becomes default_score and any
+    conditions after it are unreachable. Without one the default is 0.
+    """
+    compiled = []
+    # No condition matched - return 0 as default (matching R's case_when behavior)
+    default_score = 0.0
+    for condition_str in conditions:
+        condition, score = _parse_condition(condition_str)
+        
+        # Constant conditions are resolved here and never evaluated per row
+        constant = _condition_constant(condition)
+        if constant is True:
+            default_score = score
+            break
+        if constant is False:
+            continue
+        
+        try:
+            code = _compile_condition(condition)
+        except SyntaxError as e:
+            logger.warning("Error compiling condition '%s': %s", condition, e)
+            code = compile("False", "<rule>", "eval")
+        
+        variables = tuple(name for name in code.co_names if name in var_names)
+        compiled.append((condition, code, score, variables))
+    
+    return tuple(compiled), default_score
+
 class RuleEngine:
     def __init__(self):
         self.condition_cache = {}
+        self.vectorize_failures = set()
+        self.column_names_cache = {}
     
     def parse_condition(self, condition: str) -> tuple:
         """Parse a condition string into condition and score parts"""
-        if "~" in condition:
-            condition_part, score_part = condition.split("~", 1)
-            condition_part = condition_part.strip()
-            score_part = score_part.strip()
-            
-            # Remove extra quotes if present
-            if condition_part.startswith('"') and condition_part.endswith('"'):
-                condition_part = condition_part[1:-1]
-            if score_part.startswith('"') and score_part.endswith('"'):
-                score_part = score_part[1:-1]
-            
-            # Handle NA_real_ case
-            if score_part == "NA_real_":
-                score = np.nan
-            else:
-                try:
-                    score = float(score_part)
-                except ValueError:
-                    score = score_part
-            
-            return condition_part, score
-        else:
-            raise ValueError(f"Invalid condition format: {condition}")
+        return _parse_condition(condition)
     
     def evaluate_condition(self, condition: str, data: Dict[str, Any]) -> bool:
         """Evaluate a condition against the data"""
         try:
-            # Replace column references with actual values
-            for key, value in data.items():
-                if isinstance(value, str):
-                    condition = condition.replace(key, f"'{value}'")
-                elif pd.isna(value) or (isinstance(value, float) and np.isnan(value)):
-                    # Handle NaN values - any comparison with NaN should return False
-                    # Replace the entire condition with False if it contains NaN
-                    if key in condition:
-                        return False
-                else:
-                    condition = condition.replace(key, str(value))
-            
-            # Convert R-style operators to Python equivalents
-            condition = condition.replace("&", "and")
-            condition = condition.replace("|", "or")
+            code = self._compile_condition(condition)
             
-            # Handle special cases for TRUE and FALSE
-            if condition.strip() == 'TRUE':
-                return True
-            elif condition.strip() == 'FALSE':
-                return False
+            # Handle NaN values - any comparison with NaN should return False
+            for name in code.co_names:
+                if name in data and _is_missing(data[name]):
+                    return False
             
-            # Check if condition contains any NaN references that weren't caught above
-            if 'nan' in condition.lower():
-                return False
-            
-            # Evaluate the condition with safe context including math functions
-            safe_dict = {
-                'True': True,
-                'False': False,
-                'TRUE': True,
-                'FALSE': False,
-                'true': True,
-                'false': False,
-                'nan': float('nan'),
-                'float': float,
-                'int': int,
-                'abs': abs,
-                'min': min,
-                'max': max
-            }
-            return eval(condition, {"__builtins__": {}}, safe_dict)
+            # Column values are looked up by name, never substituted into the condition text
+            return eval(code, CONDITION_GLOBALS, data)
         except Exception as e:
-            print(f"Error evaluating condition '{condition}': {e}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Error evaluating condition '%s': %s", condition, e, exc_info=True)
             return False
     
+    def _compile_condition(self, condition: str):
+        """Translate an R-style condition to Python and compile it, once per condition"""
+        return _compile_condition(condition)
+    
     def execute_rule(self, rule: Rule, data_row: Dict[str, Any]) -> Union[float, None]:
         """Execute a rule on a single data row"""
         try:
             # Apply column mapping
-            mapped_data = {}
-            for var_name, column_path in rule.column_mapping.items():
-                # Extract column name from path like "gene_table.aster_25gene_correlation"
-                if "." in column_path:
-                    column_name = column_path.split(".")[-1]
-                else:
-                    column_name = column_path
-                
-                if column_name in data_row:
-                    mapped_data[var_name] = data_row[column_name]
-                else:
-                    mapped_data[var_name] = None
+            mapped_data = self._map_row(rule, data_row)
             
-            # Evaluate conditions in order
-            for condition_str in rule.ruleset_conditions:
-                condition, score = self.parse_condition(condition_str)
+            compiled, default_score = self._compile_rule(rule)
+            
+            # Evaluate compiled conditions in order; row values are looked up by name
+            for _, code, score, variables in compiled:
+                # Any comparison with a missing value is False
+                if any(_is_missing(mapped_data[var_name]) for var_name in variables):
+                    continue
                 
-                if self.evaluate_condition(condition, mapped_data):
-                    return score
+                try:
+                    if eval(code, CONDITION_GLOBALS, mapped_data):
+                        return score
+                except Exception as e:
+                    # Can fire once per row, so only format the message when it will be shown
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Error evaluating condition in rule '%s': %s", rule.name, e, exc_info=True)
             
-            # No condition matched - this should not happen if TRUE ~ 0 is present
-            # But if it does, return 0 as default (matching R's case_when behavior)
-            return 0.0
+            # No condition matched - the rule's TRUE catch-all score, or 0
+            return default_score
             
         except Exception as e:
-            print(f"Error executing rule '{rule.name}': {e}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Error executing rule '%s': %s", rule.name, e, exc_info=True)
             return 0.0
     
+    def _column_names(self, rule: Rule) -> Dict[str, str]:
+        """Map a rule's variables to bare column names, splitting the column paths once"""
+        mapping = tuple(rule.column_mapping.items())
+        cached = self.column_names_cache.get(id(rule))
+        if cached is not None and cached[0] == mapping:
+            return cached[1]
+        
+        # Extract column name from path like "gene_table.aster_25gene_correlation"
+        column_names = {var_name: column_path.rsplit(".", 1)[-1] for var_name, column_path in mapping}
+        
+        # C-level getter fetching every mapped column of a row as one tuple
+        var_names = tuple(column_names)
+        if len(var_names) > 1:
+            getter = itemgetter(*column_names.values())
+        elif var_names:
+            column_name = column_names[var_names[0]]
+            getter = lambda data_row: (data_row[column_name],)
+        else:
+            getter = lambda data_row: ()
+        
+        self.column_names_cache[id(rule)] = (mapping, column_names, var_names, getter)
+        return column_names
+    
+    def _map_row(self, rule: Rule, data_row: Dict[str, Any]) -> Dict[str, Any]:
+        """Map one data row to the rule's variables; missing columns map to None"""
+        column_names = self._column_names(rule)
+        _, _, var_names, getter = self.column_names_cache[id(rule)]
+        try:
+            return dict(zip(var_names, getter(data_row)))
+        except KeyError:
+            return {var_name: data_row.get(column_name) for var_name, column_name in column_names.items()}
+    
+    def _compile_rule(self, rule: Rule) -> tuple:
+        """Compile a rule's conditions into ([(condition, code, score, variables)], default_score).
+        
+        Compiled rules are cached by rule content (conditions and variable names), so
+        every engine instance in the process shares them and edited rules recompile.
+        """
+        return _compile_rule_conditions(tuple(rule.ruleset_conditions), frozenset(rule.column_mapping))
+    
+    def evaluate_condition_vectorized(
+        self,
+        condition: str,
+        columns: Dict[str, "pd.Series"],
+        n_rows: int,
+        valid_masks: Dict[str, "np.ndarray"] = None
+    ) -> "np.ndarray":
+        """Evaluate a condition against whole columns at once, returning a boolean mask.
+        
+        valid_masks optionally caches each variable's non-missing mask so conditions of
+        the same rule that reference it compute it only once.
+        """
+        import numpy as np
+        import pandas as pd
+        constant = _condition_constant(condition)
+        if constant is not None:
+            return np.full(n_rows, constant, dtype=bool)
+        
+        # Variables the condition uses, taken from its compiled form as in the row-wise path
+        names = self._compile_condition(condition).co_names
+        referenced = {var_name: column for var_name, column in columns.items() if var_name in names}
+        
+        # pandas.eval gives & and | the precedence of and/or, matching R semantics.
+        # Numeric comparisons run through numexpr when it is installed; comparisons on
+        # object (string) columns are evaluated by pandas in Python.
+        local_dict = {'TRUE': True, 'FALSE': False}
+        local_dict.update(referenced)
+        result = pd.eval(condition, local_dict=local_dict)
+        
+        if np.ndim(result) == 0:
+            mask = np.full(n_rows, bool(result), dtype=bool)
+        else:
+            mask = np.array(result, dtype=bool)
+        
+        # Any comparison involving a missing value is False, as in the row-wise path
+        if valid_masks is None:
+            valid_masks = {}
+        for var_name, column in referenced.items():
+            valid = valid_masks.get(var_name)
+            if valid is None:
+                valid = valid_masks[var_name] = column.notna().to_numpy()
+            mask &= valid
+        
+        return mask
+    
+    def execute_rule_vectorized(
+        self,
+        rule: Rule,
+        dataset: "pd.DataFrame",
+        column_data: Dict[str, "pd.Series"] = None
+    ) -> "np.ndarray":
+        """Execute a rule on every row of a dataset at once, returning one score per row.
+        
+        column_data optionally holds columns already extracted by the caller (keyed by
+        column name, positionally indexed) so they are shared across rules.
+        """
+        import numpy as np
+        n_rows = len(dataset)
+        vectorize_key = None
+        
+        try:
+            # Apply column mapping once for the whole dataset
+            columns = self._build_column_map(rule, dataset, column_data)
+            
+            # Rules that already failed to vectorize for these column types go straight
+            # to the row-wise path instead of failing (and reporting) again
+            vectorize_key = (
+                rule.id,
+                tuple(rule.ruleset_conditions),
+                tuple((var_name, str(column.dtype)) for var_name, column in columns.items())
+            )
+            if vectorize_key in self.vectorize_failures:
+                return self._execute_rule_rows(rule, dataset)
+            
+            # Evaluate every condition to a mask, then pick the first matching condition's
+            # score per row in one np.select pass
+            compiled, default_score = self._compile_rule(rule)
+            masks = []
+            scores = []
+            valid_masks = {}
+            for condition, _, score, _ in compiled:
+                masks.append(self.evaluate_condition_vectorized(condition, columns, n_rows, valid_masks))
+                scores.append(score)
+            
+            # Non-numeric scores keep their type, as in the row-wise path
+            if isinstance(default_score, str) or any(isinstance(score, str) for score in scores):
+                scores = [np.full(n_rows, score, dtype=object) for score in scores]
+                if not masks:
+                    return np.full(n_rows, default_score, dtype=object)
+            elif not masks:
+                return np.full(n_rows, default_score, dtype=float)
+            
+            # Rows matching no condition get the TRUE catch-all score (or 0)
+            return np.select(masks, scores, default=default_score)
+            
+        except Exception as e:
+            logger.warning("Vectorized execution failed for rule '%s', falling back to row-wise: %s", rule.name, e)
+            if vectorize_key is not None:
+                self.vectorize_failures.add(vectorize_key)
+            return self._execute_rule_rows(rule, dataset)
+    
+    def _build_column_map(
+        self,
+        rule: Rule,
+        dataset: "pd.DataFrame",
+        column_data: Dict[str, "pd.Series"] = None
+    ) -> Dict[str, "pd.Series"]:
+        """Map each of a rule's variables to its dataset column, for evaluation by name.
+        
+        Columns are positionally indexed so evaluation never aligns on the dataset index;
+        variables whose column is missing get an all-NaN column.
+        """
+        import numpy as np
+        import pandas as pd
+        n_rows = len(dataset)
+        columns = {}
+        for var_name, column_name in self._column_names(rule).items():
+            if column_data is not None and column_name in column_data:
+                columns[var_name] = column_data[column_name]
+            elif column_name in dataset.columns:
+                columns[var_name] = dataset[column_name].reset_index(drop=True)
+            else:
+                columns[var_name] = pd.Series(np.nan, index=pd.RangeIndex(n_rows))
+        
+        return columns
+    
+    def _execute_rule_rows(self, rule: Rule, dataset: "pd.DataFrame") -> "np.ndarray":
+        """Execute a rule row by row, returning one score per row.
+        
+        Scores are float64 (NaN for missing scores), as in the vectorized path; only rules
+        that produce non-numeric scores return an object array.
+        """
+        import numpy as np
+        import pandas as pd
+        scores = [self.execute_rule(rule, row_dict) for row_dict in dataset.to_dict('records')]
+        if any(isinstance(score, str) for score in scores):
+            return np.array(scores, dtype=object)
+        return pd.to_numeric(pd.Series(scores, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    
+    def apply_dataframe(self, rule: Rule, df: "pd.DataFrame") -> "pd.Series":
+        """Execute a rule column-wise on a DataFrame, returning scores aligned to its index"""
+        import pandas as pd
+        return pd.Series(self.execute_rule_vectorized(rule, df), index=df.index, name=f"{rule.name}_SCORE")
+    
     def test_rule(self, rule: Rule, sample_data: Dict[str, Any]) -> Dict[str, Any]:
         """Test a rule on sample data and return detailed results"""
         result = {
@@ -126,17 +412,7 @@ class RuleEngine:
         
         try:
             # Apply column mapping
-            mapped_data = {}
-            for var_name, column_path in rule.column_mapping.items():
-                if "." in column_path:
-                    column_name = column_path.split(".")[-1]
-                else:
-                    column_name = column_path
-                
-                if column_name in sample_data:
-                    mapped_data[var_name] = sample_data[column_name]
-                else:
-                    mapped_data[var_name] = None
+            mapped_data = self._map_row(rule, sample_data)
             
             result["mapped_data"] = mapped_data
             
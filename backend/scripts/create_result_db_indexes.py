@@ -6,21 +6,23 @@ This script creates indexes for fast gene lookups and analysis result queries.
 
 import os
 import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add the backend directory to the Python path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+from app.models.database import SQLITE_BULK_PRAGMAS, SQLITE_DEFAULT_PRAGMAS, set_sqlite_pragmas
 from app.models.result_database import result_engine, ResultSessionLocal
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 
 
 def create_performance_indexes():
     """Create performance indexes for the result database"""
     print("Creating performance indexes for result database...")
     
-    db = ResultSessionLocal()
     try:
         # Create indexes for analysis_results table
         indexes = [
@@ -41,63 +43,87 @@ def create_performance_indexes():
             "CREATE INDEX IF NOT EXISTS idx_tracker_storage_location ON analysis_result_tracker(storage_location)",
         ]
         
-        for index_sql in indexes:
-            print(f"Creating index: {index_sql}")
-            db.execute(text(index_sql))
+        # One connection and one transaction for all DDL; raw driver SQL skips
+        # per-statement text() compilation and session autoflush
+        with result_engine.connect() as conn:
+            set_sqlite_pragmas(conn, SQLITE_BULK_PRAGMAS)
+            try:
+                with conn.begin():
+                    for index_sql in indexes:
+                        print(f"Creating index: {index_sql}")
+                        conn.exec_driver_sql(index_sql)
+            finally:
+                # Pooled connections must not keep the relaxed settings
+                set_sqlite_pragmas(conn, SQLITE_DEFAULT_PRAGMAS)
         
-        db.commit()
         print("✓ Performance indexes created successfully")
         
     except Exception as e:
-        db.rollback()
         print(f"✗ Error creating indexes: {str(e)}")
         raise
-    finally:
-        db.close()
+
+
+def _create_table_indexes(conn, table_name):
+    """Create the indexes for one wide format table on the given connection"""
+    print(f"Creating indexes for table: {table_name}")
+    
+    # Create indexes for each wide table
+    table_indexes = [
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_analysis_result_id ON {table_name}(analysis_result_id)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_key_column_value ON {table_name}(key_column_value)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_total_score ON {table_name}(total_score)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_analysis_key ON {table_name}(analysis_result_id, key_column_value)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_score_desc ON {table_name}(total_score DESC)",
+    ]
+    
+    for index_sql in table_indexes:
+        try:
+            conn.exec_driver_sql(index_sql)
+        except Exception as e:
+            print(f"  Warning: Could not create index {index_sql}: {str(e)}")
+
+
+def _create_table_indexes_in_transaction(table_name):
+    """Create one wide table's indexes on its own pooled connection and transaction"""
+    with result_engine.begin() as conn:
+        _create_table_indexes(conn, table_name)
 
 
 def create_wide_table_indexes():
     """Create indexes for existing wide format tables"""
     print("Creating indexes for wide format tables...")
     
-    db = ResultSessionLocal()
     try:
-        # Find all wide format tables
-        result = db.execute(text("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name LIKE 'rubric_%_analysis_result'
-        """))
+        # Find all wide format tables (through the inspector, so any backend works)
+        wide_tables = [
+            name for name in inspect(result_engine).get_table_names()
+            if name.startswith("rubric_") and name.endswith("_analysis_result")
+        ]
         
-        wide_tables = [row[0] for row in result.fetchall()]
         print(f"Found {len(wide_tables)} wide format tables")
         
-        for table_name in wide_tables:
-            print(f"Creating indexes for table: {table_name}")
-            
-            # Create indexes for each wide table
-            table_indexes = [
-                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_analysis_result_id ON {table_name}(analysis_result_id)",
-                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_key_column_value ON {table_name}(key_column_value)",
-                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_total_score ON {table_name}(total_score)",
-                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_analysis_key ON {table_name}(analysis_result_id, key_column_value)",
-                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_score_desc ON {table_name}(total_score DESC)",
-            ]
-            
-            for index_sql in table_indexes:
+        if result_engine.dialect.name == "sqlite" or len(wide_tables) < 2:
+            # SQLite allows a single writer at a time, so parallel connections would
+            # only contend for the write lock; build everything in one transaction
+            with result_engine.connect() as conn:
+                set_sqlite_pragmas(conn, SQLITE_BULK_PRAGMAS)
                 try:
-                    db.execute(text(index_sql))
-                except Exception as e:
-                    print(f"  Warning: Could not create index {index_sql}: {str(e)}")
+                    with conn.begin():
+                        for table_name in wide_tables:
+                            _create_table_indexes(conn, table_name)
+                finally:
+                    set_sqlite_pragmas(conn, SQLITE_DEFAULT_PRAGMAS)
+        else:
+            # Index builds on independent tables run concurrently, one connection each
+            max_workers = min(len(wide_tables), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(_create_table_indexes_in_transaction, wide_tables))
         
-        db.commit()
         print("✓ Wide table indexes created successfully")
         
     except Exception as e:
-        db.rollback()
         print(f"✗ Error creating wide table indexes: {str(e)}")
         raise
-    finally:
-        db.close()
 
 
 def verify_indexes():
@@ -106,35 +132,35 @@ def verify_indexes():
     
     db = ResultSessionLocal()
     try:
-        # Check analysis_results indexes
+        # One scan of sqlite_master for every index, bucketed by table
         result = db.execute(text("""
-            SELECT name FROM sqlite_master 
-            WHERE type='index' AND tbl_name='analysis_results'
+            SELECT name, tbl_name FROM sqlite_master 
+            WHERE type='index'
         """))
         
-        analysis_indexes = [row[0] for row in result.fetchall()]
+        indexes_by_table = defaultdict(list)
+        for index_name, table_name in result.fetchall():
+            indexes_by_table[table_name].append(index_name)
+        
+        # Check analysis_results indexes
+        analysis_indexes = indexes_by_table["analysis_results"]
         print(f"Analysis results table has {len(analysis_indexes)} indexes:")
         for idx in analysis_indexes:
             print(f"  - {idx}")
         
         # Check tracker indexes
-        result = db.execute(text("""
-            SELECT name FROM sqlite_master 
-            WHERE type='index' AND tbl_name='analysis_result_tracker'
-        """))
-        
-        tracker_indexes = [row[0] for row in result.fetchall()]
+        tracker_indexes = indexes_by_table["analysis_result_tracker"]
         print(f"Analysis result tracker table has {len(tracker_indexes)} indexes:")
         for idx in tracker_indexes:
             print(f"  - {idx}")
         
         # Check wide table indexes
-        result = db.execute(text("""
-            SELECT name FROM sqlite_master 
-            WHERE type='index' AND tbl_name LIKE 'rubric_%_analysis_result'
-        """))
-        
-        wide_indexes = [row[0] for row in result.fetchall()]
+        wide_indexes = [
+            idx
+            for table_name, table_indexes in indexes_by_table.items()
+            if table_name.startswith("rubric_") and table_name.endswith("_analysis_result")
+            for idx in table_indexes
+        ]
         print(f"Wide format tables have {len(wide_indexes)} indexes:")
         for idx in wide_indexes:
             print(f"  - {idx}")
@@ -21,23 +21,122 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload
 from app.models.database import SessionLocal
 from app.models.view_permission import ViewPermission, UserViewPermission, PermissionGroup, UserPermissionGroup
 from app.models.user import User
 from app.schemas.view_permission import PermissionType, ViewCategory
 
+# Permission flags of a UserViewPermission, in bit order (bit 0 = view ... bit 4 = admin)
+_FLAG_NAMES = ("view", "create", "edit", "delete", "admin")
+_FLAG_ATTRS = ("can_view", "can_create", "can_edit", "can_delete", "can_admin")
+
+# Bit for each permission name
+_FLAG_BITS = {name: 1 << i for i, name in enumerate(_FLAG_NAMES)}
+
+# Permission names for every combination of the five flags, indexed by bitmask
+_DECODE = [tuple(name for i, name in enumerate(_FLAG_NAMES) if mask >> i & 1) for mask in range(1 << len(_FLAG_NAMES))]
+
+def _permission_mask(perm: UserViewPermission) -> int:
+    """Pack the five can_* flags of a user view permission into a bitmask"""
+    return (
+        bool(perm.can_view)
+        | bool(perm.can_create) << 1
+        | bool(perm.can_edit) << 2
+        | bool(perm.can_delete) << 3
+        | bool(perm.can_admin) << 4
+    )
+
+def _insert_if_missing(db: Session, model, conflict_columns, **values) -> bool:
+    """Insert a row unless one with the same unique key exists, in one statement.
+    
+    Returns True if a row was inserted.
+    """
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    result = db.execute(insert(model).values(**values).on_conflict_do_nothing(index_elements=conflict_columns))
+    db.commit()
+    return result.rowcount == 1
+
+# Effective permission bitmask per view for one user, computed in SQLite: direct permission
+# flags UNION ALL the group default permissions unnested with json_each, OR-ed per view
+_EFFECTIVE_PERMISSIONS_SQL = text("""
+    SELECT view_name,
+           MAX(can_view) | (MAX(can_create) << 1) | (MAX(can_edit) << 2)
+           | (MAX(can_delete) << 3) | (MAX(can_admin) << 4) AS mask
+    FROM (
+        SELECT vp.view_name AS view_name,
+               COALESCE(uvp.can_view, 0) AS can_view,
+               COALESCE(uvp.can_create, 0) AS can_create,
+               COALESCE(uvp.can_edit, 0) AS can_edit,
+               COALESCE(uvp.can_delete, 0) AS can_delete,
+               COALESCE(uvp.can_admin, 0) AS can_admin
+        FROM user_view_permissions uvp
+        JOIN view_permissions vp ON vp.id = uvp.view_permission_id
+        WHERE uvp.user_id = :user_id AND uvp.is_active = 1
+        UNION ALL
+        SELECT views.key,
+               perms.value = 'view',
+               perms.value = 'create',
+               perms.value = 'edit',
+               perms.value = 'delete',
+               perms.value = 'admin'
+        FROM user_permission_groups upg
+        JOIN permission_groups pg ON pg.id = upg.permission_group_id,
+             json_each(pg.default_permissions) AS views,
+             json_each(views.value) AS perms
+        WHERE upg.user_id = :user_id AND upg.is_active = 1
+    )
+    GROUP BY view_name
+    ORDER BY view_name
+""")
+
+def _effective_permission_masks(db: Session, user: User, direct_permissions, group_permissions) -> dict:
+    """Combine a user's direct and group permissions into {view_name: bitmask}.
+    
+    On SQLite the union is done by the database in one query; otherwise group default
+    permissions are OR-ed into the direct permissions in Python. The result is kept in
+    the session's info dict, so later checks for the same user within the session reuse it.
+    """
+    cache_key = ("effective_permissions", user.id)
+    if cache_key in db.info:
+        return db.info[cache_key]
+    
+    if db.get_bind().dialect.name == "sqlite":
+        effective_permissions = dict(db.execute(_EFFECTIVE_PERMISSIONS_SQL, {"user_id": user.id}).all())
+        db.info[cache_key] = effective_permissions
+        return effective_permissions
+    
+    # Start with direct permissions
+    effective_permissions = {}
+    for perm in direct_permissions:
+        view_name = perm.view_permission.view_name
+        effective_permissions[view_name] = effective_permissions.get(view_name, 0) | _permission_mask(perm)
+    
+    # Add group permissions (union with direct permissions)
+    for group_perm in group_permissions:
+        permission_group = group_perm.permission_group
+        default_permissions = permission_group.default_permissions if permission_group else None
+        if default_permissions:
+            for view_name, permissions in default_permissions.items():
+                group_mask = 0
+                for permission in permissions:
+                    group_mask |= _FLAG_BITS.get(permission, 0)
+                effective_permissions[view_name] = effective_permissions.get(view_name, 0) | group_mask
+    
+    # Same view-name order as the SQLite query
+    effective_permissions = dict(sorted(effective_permissions.items()))
+    db.info[cache_key] = effective_permissions
+    return effective_permissions
+
 def create_example_view_permission(db: Session):
     """Create an example custom view permission"""
     print("Creating example view permission...")
     
-    # Check if example view already exists
-    existing = db.query(ViewPermission).filter(ViewPermission.view_name == "example_view").first()
-    if existing:
-        print("  - Example view permission already exists")
-        return existing
-    
-    view_permission = ViewPermission(
+    created = _insert_if_missing(
+        db, ViewPermission, ["view_name"],
         view_name="example_view",
         view_display_name="Example Custom View",
         view_description="An example custom view for demonstration purposes",
@@ -47,10 +146,11 @@ def create_example_view_permission(db: Session):
         api_endpoint="/api/example",
         is_system_view=False
     )
+    view_permission = db.query(ViewPermission).filter(ViewPermission.view_name == "example_view").one()
     
-    db.add(view_permission)
-    db.commit()
-    db.refresh(view_permission)
+    if not created:
+        print("  - Example view permission already exists")
+        return view_permission
     
     print(f"  ✓ Created view permission: {view_permission.view_display_name}")
     return view_permission
@@ -59,13 +159,8 @@ def create_example_permission_group(db: Session):
     """Create an example custom permission group"""
     print("Creating example permission group...")
     
-    # Check if example group already exists
-    existing = db.query(PermissionGroup).filter(PermissionGroup.group_name == "example_group").first()
-    if existing:
-        print("  - Example permission group already exists")
-        return existing
-    
-    permission_group = PermissionGroup(
+    created = _insert_if_missing(
+        db, PermissionGroup, ["group_name"],
         group_name="example_group",
         group_display_name="Example Group",
         group_description="An example permission group for demonstration",
@@ -78,10 +173,11 @@ def create_example_permission_group(db: Session):
         },
         is_system_group=False
     )
+    permission_group = db.query(PermissionGroup).filter(PermissionGroup.group_name == "example_group").one()
     
-    db.add(permission_group)
-    db.commit()
-    db.refresh(permission_group)
+    if not created:
+        print("  - Example permission group already exists")
+        return permission_group
     
     print(f"  ✓ Created permission group: {permission_group.group_display_name}")
     return permission_group
@@ -90,17 +186,8 @@ def assign_permissions_to_user(db: Session, user: User, view_permission: ViewPer
     """Assign specific permissions to a user"""
     print(f"Assigning permissions to user: {user.username}")
     
-    # Check if permission already exists
-    existing = db.query(UserViewPermission).filter(
-        UserViewPermission.user_id == user.id,
-        UserViewPermission.view_permission_id == view_permission.id
-    ).first()
-    
-    if existing:
-        print("  - User already has permissions for this view")
-        return existing
-    
-    user_permission = UserViewPermission(
+    created = _insert_if_missing(
+        db, UserViewPermission, ["user_id", "view_permission_id"],
         user_id=user.id,
         view_permission_id=view_permission.id,
         can_view=True,
@@ -111,10 +198,14 @@ def assign_permissions_to_user(db: Session, user: User, view_permission: ViewPer
         granted_by=user.id,  # Self-granted for example
         notes="Example permission assignment"
     )
+    user_permission = db.query(UserViewPermission).filter(
+        UserViewPermission.user_id == user.id,
+        UserViewPermission.view_permission_id == view_permission.id
+    ).one()
     
-    db.add(user_permission)
-    db.commit()
-    db.refresh(user_permission)
+    if not created:
+        print("  - User already has permissions for this view")
+        return user_permission
     
     print(f"  ✓ Assigned permissions to {user.username}")
     return user_permission
@@ -123,26 +214,21 @@ def assign_user_to_group(db: Session, user: User, permission_group: PermissionGr
     """Assign a user to a permission group"""
     print(f"Assigning user {user.username} to group: {permission_group.group_display_name}")
     
-    # Check if user is already in group
-    existing = db.query(UserPermissionGroup).filter(
-        UserPermissionGroup.user_id == user.id,
-        UserPermissionGroup.permission_group_id == permission_group.id
-    ).first()
-    
-    if existing:
-        print("  - User is already in this group")
-        return existing
-    
-    user_group = UserPermissionGroup(
+    created = _insert_if_missing(
+        db, UserPermissionGroup, ["user_id", "permission_group_id"],
         user_id=user.id,
         permission_group_id=permission_group.id,
         assigned_by=user.id,  # Self-assigned for example
         assignment_notes="Example group assignment"
     )
+    user_group = db.query(UserPermissionGroup).filter(
+        UserPermissionGroup.user_id == user.id,
+        UserPermissionGroup.permission_group_id == permission_group.id
+    ).one()
     
-    db.add(user_group)
-    db.commit()
-    db.refresh(user_group)
+    if not created:
+        print("  - User is already in this group")
+        return user_group
     
     print(f"  ✓ Assigned {user.username} to {permission_group.group_display_name}")
     return user_group
@@ -153,112 +239,97 @@ def check_user_permissions(db: Session, user: User):
     print("=" * 50)
     
     # Get direct permissions
-    direct_permissions = db.query(UserViewPermission).filter(
+    direct_permissions = db.query(UserViewPermission).options(
+        joinedload(UserViewPermission.view_permission)
+    ).filter(
         UserViewPermission.user_id == user.id,
         UserViewPermission.is_active == True
     ).all()
     
-    print("Direct Permissions:")
+    # Collect the report and write it in one call instead of one print per line
+    lines = ["Direct Permissions:"]
     if direct_permissions:
         for perm in direct_permissions:
-            permissions = []
-            if perm.can_view:
-                permissions.append("view")
-            if perm.can_create:
-                permissions.append("create")
-            if perm.can_edit:
-                permissions.append("edit")
-            if perm.can_delete:
-                permissions.append("delete")
-            if perm.can_admin:
-                permissions.append("admin")
-            
-            print(f"  - {perm.view_permission.view_display_name}: {', '.join(permissions)}")
+            lines.append(f"  - {perm.view_permission.view_display_name}: {', '.join(_DECODE[_permission_mask(perm)])}")
     else:
-        print("  - No direct permissions")
+        lines.append("  - No direct permissions")
     
     # Get group permissions
-    group_permissions = db.query(UserPermissionGroup).filter(
+    group_permissions = db.query(UserPermissionGroup).options(
+        joinedload(UserPermissionGroup.permission_group)
+    ).filter(
         UserPermissionGroup.user_id == user.id,
         UserPermissionGroup.is_active == True
     ).all()
     
-    print("\nGroup Memberships:")
+    lines.append("")
+    lines.append("Group Memberships:")
     if group_permissions:
         for group_perm in group_permissions:
-            print(f"  - {group_perm.permission_group.group_display_name}")
-            if group_perm.permission_group.default_permissions:
-                for view_name, perms in group_perm.permission_group.default_permissions.items():
-                    print(f"    - {view_name}: {', '.join(perms)}")
+            permission_group = group_perm.permission_group
+            default_permissions = permission_group.default_permissions
+            lines.append(f"  - {permission_group.group_display_name}")
+            if default_permissions:
+                for view_name, perms in default_permissions.items():
+                    lines.append(f"    - {view_name}: {', '.join(perms)}")
     else:
-        print("  - No group memberships")
+        lines.append("  - No group memberships")
     
     # Calculate effective permissions
-    print("\nEffective Permissions:")
-    effective_permissions = {}
-    
-    # Start with direct permissions
-    for perm in direct_permissions:
-        view_name = perm.view_permission.view_name
-        permissions = []
-        
-        if perm.can_view:
-            permissions.append("view")
-        if perm.can_create:
-            permissions.append("create")
-        if perm.can_edit:
-            permissions.append("edit")
-        if perm.can_delete:
-            permissions.append("delete")
-        if perm.can_admin:
-            permissions.append("admin")
-        
-        effective_permissions[view_name] = permissions
-    
-    # Add group permissions (union with direct permissions)
-    for group_perm in group_permissions:
-        if group_perm.permission_group and group_perm.permission_group.default_permissions:
-            for view_name, permissions in group_perm.permission_group.default_permissions.items():
-                if view_name not in effective_permissions:
-                    effective_permissions[view_name] = permissions
-                else:
-                    # Merge permissions (union)
-                    current_perms = set(effective_permissions[view_name])
-                    group_perms = set(permissions)
-                    effective_permissions[view_name] = list(current_perms.union(group_perms))
+    lines.append("")
+    lines.append("Effective Permissions:")
+    effective_permissions = _effective_permission_masks(db, user, direct_permissions, group_permissions)
     
     if effective_permissions:
-        for view_name, permissions in effective_permissions.items():
-            print(f"  - {view_name}: {', '.join(permissions)}")
+        for view_name, mask in effective_permissions.items():
+            lines.append(f"  - {view_name}: {', '.join(_DECODE[mask])}")
     else:
-        print("  - No effective permissions")
+        lines.append("  - No effective permissions")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def list_all_permissions(db: Session):
     """List all available view permissions and groups"""
-    print("\nAvailable View Permissions:")
-    print("=" * 50)
+    # Collect the report and write it in one call instead of one print per line
+    lines = ["", "Available View Permissions:", "=" * 50]
     
-    view_permissions = db.query(ViewPermission).filter(ViewPermission.is_active == True).all()
+    # Select only the printed columns; rows come back as lightweight named tuples
+    view_permissions = db.query(
+        ViewPermission.view_name,
+        ViewPermission.view_display_name,
+        ViewPermission.view_category,
+        ViewPermission.available_permissions,
+        ViewPermission.is_system_view
+    ).filter(ViewPermission.is_active == True).yield_per(500)
     for vp in view_permissions:
-        print(f"  - {vp.view_name}: {vp.view_display_name}")
-        print(f"    Category: {vp.view_category}")
-        print(f"    Available permissions: {', '.join(vp.available_permissions)}")
-        print(f"    System view: {vp.is_system_view}")
-        print()
+        lines.append(f"  - {vp.view_name}: {vp.view_display_name}")
+        lines.append(f"    Category: {vp.view_category}")
+        lines.append(f"    Available permissions: {', '.join(vp.available_permissions)}")
+        lines.append(f"    System view: {vp.is_system_view}")
+        lines.append("")
     
-    print("Available Permission Groups:")
-    print("=" * 50)
+    lines.append("Available Permission Groups:")
+    lines.append("=" * 50)
     
-    permission_groups = db.query(PermissionGroup).filter(PermissionGroup.is_active == True).all()
+    permission_groups = db.query(
+        PermissionGroup.group_name,
+        PermissionGroup.group_display_name,
+        PermissionGroup.group_description,
+        PermissionGroup.is_system_group,
+        PermissionGroup.default_permissions
+    ).filter(PermissionGroup.is_active == True).yield_per(500)
     for pg in permission_groups:
-        print(f"  - {pg.group_name}: {pg.group_display_name}")
-        print(f"    Description: {pg.group_description}")
-        print(f"    System group: {pg.is_system_group}")
-        if pg.default_permissions:
-            print("    Default permissions:")
-            for view_name, permissions in pg.default_permissions.items():
-                print(f"      - {view_name}: {', '.join(permissions)}")
-        print()
+        lines.append(f"  - {pg.group_name}: {pg.group_display_name}")
+        lines.append(f"    Description: {pg.group_description}")
+        lines.append(f"    System group: {pg.is_system_group}")
+        default_permissions = pg.default_permissions
+        if default_permissions:
+            lines.append("    Default permissions:")
+            for view_name, permissions in default_permissions.items():
+                lines.append(f"      - {view_name}: {', '.join(permissions)}")
+        lines.append("")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     print("Permissions System Usage Example")
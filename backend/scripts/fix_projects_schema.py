@@ -5,6 +5,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import sqlite3
 from app.models.database import engine, Base
 
+# Column types for project columns that may be missing from older databases
+PROJECT_COLUMN_DDL = {
+    'owner_id': 'VARCHAR(32)',
+    'applied_rules': 'JSON',
+    'applied_rubrics': 'JSON',
+    'execution_history': 'JSON',
+}
+
 def fix_projects_schema():
     """Fix the projects table schema by adding missing columns"""
     print("Fixing projects table schema...")
@@ -15,39 +23,22 @@ def fix_projects_schema():
     
     try:
         # Check current schema
-        cursor.execute('PRAGMA table_info(projects)')
-        columns = cursor.fetchall()
-        column_names = [col[1] for col in columns]
-        print(f"Current columns: {column_names}")
+        column_names = {col[1] for col in cursor.execute('PRAGMA table_info(projects)')}
+        print(f"Current columns: {sorted(column_names)}")
         
-        # Add owner_id if it doesn't exist
-        if 'owner_id' not in column_names:
-            print("Adding owner_id column...")
-            cursor.execute('ALTER TABLE projects ADD COLUMN owner_id VARCHAR(32)')
-            print("owner_id column added!")
-        else:
-            print("owner_id column already exists")
-        
-        # Check if we need to add any other missing columns
-        expected_columns = [
-            'id', 'name', 'description', 'owner_name', 'owner_id', 
-            'organization', 'created_date', 'input_data_file', 
-            'applied_rules', 'applied_rubrics', 'results', 'execution_history'
-        ]
-        
-        missing_columns = [col for col in expected_columns if col not in column_names]
+        missing_columns = [col for col in PROJECT_COLUMN_DDL if col not in column_names]
         if missing_columns:
             print(f"Missing columns: {missing_columns}")
+            # Apply all ALTERs as one script in a single write transaction
+            cursor.executescript(
+                "BEGIN IMMEDIATE;\n"
+                + "\n".join(f"ALTER TABLE projects ADD COLUMN {col} {PROJECT_COLUMN_DDL[col]};" for col in missing_columns)
+                + "\nCOMMIT;"
+            )
             for col in missing_columns:
-                if col == 'owner_id':
-                    cursor.execute('ALTER TABLE projects ADD COLUMN owner_id VARCHAR(32)')
-                elif col == 'applied_rules':
-                    cursor.execute('ALTER TABLE projects ADD COLUMN applied_rules JSON')
-                elif col == 'applied_rubrics':
-                    cursor.execute('ALTER TABLE projects ADD COLUMN applied_rubrics JSON')
-                elif col == 'execution_history':
-                    cursor.execute('ALTER TABLE projects ADD COLUMN execution_history JSON')
                 print(f"Added {col} column")
+        else:
+            print("No missing columns")
         
         # Verify the schema
         cursor.execute('PRAGMA table_info(projects)')
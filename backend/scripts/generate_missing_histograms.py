@@ -11,12 +11,15 @@ This script will:
 
 import sys
 import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add the backend directory to the Python path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 from app.models.database import get_db
 from app.models.dataset import Dataset, DatasetColumn, DatasetHistogram
@@ -25,55 +28,55 @@ from app.services.dataset_processor import DatasetProcessor
 def find_datasets_missing_histograms(db: Session):
     """Find datasets that don't have histogram data"""
     
-    # Get all datasets
-    all_datasets = db.query(Dataset).all()
+    # One query: count each dataset's numeric/score columns and histograms, keeping
+    # datasets that have numeric columns but no histograms
+    numeric_columns = func.count(DatasetColumn.id.distinct()).label('numeric_columns')
+    query = db.query(Dataset.id, Dataset.name, Dataset.created_date, numeric_columns).outerjoin(
+        DatasetColumn,
+        and_(
+            DatasetColumn.dataset_id == Dataset.id,
+            DatasetColumn.column_type.in_(['numeric', 'score'])
+        )
+    ).outerjoin(
+        DatasetHistogram, DatasetHistogram.dataset_id == Dataset.id
+    ).group_by(Dataset.id).having(
+        and_(func.count(DatasetHistogram.id) == 0, numeric_columns > 0)
+    )
     
-    datasets_missing_histograms = []
-    
-    for dataset in all_datasets:
-        # Check if this dataset has any histograms
-        histogram_count = db.query(DatasetHistogram).filter(
-            DatasetHistogram.dataset_id == dataset.id
-        ).count()
-        
-        if histogram_count == 0:
-            # Check if this dataset has numeric columns
-            numeric_columns = db.query(DatasetColumn).filter(
-                DatasetColumn.dataset_id == dataset.id,
-                DatasetColumn.column_type.in_(['numeric', 'score'])
-            ).count()
-            
-            if numeric_columns > 0:
-                datasets_missing_histograms.append({
-                    'dataset': dataset,
-                    'numeric_columns': numeric_columns
-                })
-    
-    return datasets_missing_histograms
+    return [
+        {'id': dataset_id, 'name': name, 'created_date': created_date, 'numeric_columns': numeric_count}
+        for dataset_id, name, created_date, numeric_count in query
+    ]
 
-def generate_histograms_for_dataset(db: Session, dataset, processor: DatasetProcessor, bin_count: int = 30):
-    """Generate histograms for a specific dataset"""
+def get_numeric_columns(db: Session, dataset_ids):
+    """Return {dataset_id: [(column_id, original_name), ...]} for the numeric columns of the given datasets"""
+    numeric_columns = defaultdict(list)
+    for dataset_id, column_id, original_name in db.query(
+        DatasetColumn.dataset_id, DatasetColumn.id, DatasetColumn.original_name
+    ).filter(
+        DatasetColumn.dataset_id.in_(dataset_ids),
+        DatasetColumn.column_type.in_(['numeric', 'score'])
+    ):
+        numeric_columns[dataset_id].append((column_id, original_name))
+    return numeric_columns
+
+def save_histograms_for_dataset(db: Session, histogram_rows) -> int:
+    """Save one dataset's computed histogram rows"""
     
     try:
-        print(f"  🔄 Generating histograms for dataset: {dataset.name}")
-        
-        # Generate histograms
-        histograms = processor.generate_histograms_for_dataset(db, dataset.id, bin_count)
-        
-        if histograms:
-            # Save to database
-            for histogram in histograms:
-                db.add(histogram)
+        if histogram_rows:
+            # Save to database in one executemany insert
+            db.bulk_insert_mappings(DatasetHistogram, histogram_rows)
             db.commit()
             
-            print(f"  ✅ Generated {len(histograms)} histograms successfully")
-            return len(histograms)
+            print(f"  ✅ Generated {len(histogram_rows)} histograms successfully")
+            return len(histogram_rows)
         else:
             print(f"  ⚠️  No histograms generated (no valid numeric data)")
             return 0
             
     except Exception as e:
-        print(f"  ❌ Error generating histograms: {e}")
+        print(f"  ❌ Error saving histograms: {e}")
         db.rollback()
         return 0
 
@@ -98,24 +101,38 @@ def main():
         
         print(f"📊 Found {len(datasets_missing)} datasets missing histogram data:")
         
+        columns_by_dataset = get_numeric_columns(db, [item['id'] for item in datasets_missing])
+        
         total_histograms_generated = 0
         successful_datasets = 0
         
-        for i, item in enumerate(datasets_missing, 1):
-            dataset = item['dataset']
-            numeric_columns = item['numeric_columns']
-            
-            print(f"\n📈 Dataset {i}/{len(datasets_missing)}: {dataset.name}")
-            print(f"  📊 Dataset ID: {dataset.id}")
-            print(f"  📈 Numeric columns: {numeric_columns}")
-            print(f"  📅 Created: {dataset.created_date}")
-            
-            # Generate histograms for this dataset
-            histograms_generated = generate_histograms_for_dataset(db, dataset, processor)
+        # Histograms are computed from the dataset files in worker threads, without the
+        # database. Only this thread writes to the database (SQLite allows one writer),
+        # saving each dataset's histograms in order.
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            futures = [
+                executor.submit(processor.compute_histograms, item['id'], columns_by_dataset[item['id']])
+                for item in datasets_missing
+            ]
             
-            if histograms_generated > 0:
-                total_histograms_generated += histograms_generated
-                successful_datasets += 1
+            for i, (item, future) in enumerate(zip(datasets_missing, futures), 1):
+                print(f"\n📈 Dataset {i}/{len(datasets_missing)}: {item['name']}")
+                print(f"  📊 Dataset ID: {item['id']}")
+                print(f"  📈 Numeric columns: {item['numeric_columns']}")
+                print(f"  📅 Created: {item['created_date']}")
+                print(f"  🔄 Generating histograms for dataset: {item['name']}")
+                
+                try:
+                    histogram_rows = future.result()
+                except Exception as e:
+                    print(f"  ❌ Error generating histograms: {e}")
+                    continue
+                
+                histograms_generated = save_histograms_for_dataset(db, histogram_rows)
+                
+                if histograms_generated > 0:
+                    total_histograms_generated += histograms_generated
+                    successful_datasets += 1
         
         # Summary
         print(f"\n📊 Summary:")
@@ -2,14 +2,22 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import inspect
 from app.models.database import engine, Base
 
 def init_database():
     """Initialize the database with all tables"""
     print("Initializing SQLite database...")
     
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Create only the tables that don't exist yet; one table listing replaces
+    # create_all's per-table existence checks when the schema is already in place
+    existing_tables = set(inspect(engine).get_table_names())
+    missing_tables = [table for table in Base.metadata.sorted_tables if table.name not in existing_tables]
+    if missing_tables:
+        print(f"Creating tables: {', '.join(table.name for table in missing_tables)}")
+        Base.metadata.create_all(bind=engine, tables=missing_tables, checkfirst=False)
+    else:
+        print("All tables already exist")
     
     print("Database initialized successfully!")
     print("Database file: rubrics.db")
@@ -2,15 +2,19 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.models.database import SessionLocal, engine, Base
 from app.models.rule import Rule
 from app.models.rubric import Rubric
 from app.models.rubric_rule import RubricRule
+import re
 import uuid
+from functools import lru_cache
 from datetime import datetime
 import pandas as pd
 
+@lru_cache(maxsize=4096)
 def parse_r_condition(condition_str):
     """Parse R-style condition string to Python format"""
     # Replace R-specific syntax with Python equivalents
@@ -19,121 +23,152 @@ def parse_r_condition(condition_str):
     condition = condition.replace("|", "or")
     return condition
 
+# One element of an R list body: commas inside a quoted string (either quote character,
+# closed by the same character) do not split elements
+_R_LIST_ELEMENT = re.compile(r"""(?:"[^"]*"?|'[^']*'?|[^,'"])+""")
+
+# The quoted string an element starts with; its quotes are removed
+_R_LEADING_QUOTED = re.compile(r"""^\s*(["'])(.*?)(?:\1|$)""")
+
+def _r_list_bodies(values: pd.Series) -> pd.Series:
+    """Strip the list( ... ) wrapper from R list strings, dropping values that aren't lists"""
+    values = values.astype(object)
+    is_list = values.str.contains('list(', regex=False, na=False)
+    return values[is_list].str.replace('list(', '', regex=False).str.replace(')', '', regex=False)
+
+def _parse_distinct(values: pd.Series, parse, copy) -> pd.Series:
+    """Apply a column parser to each distinct value once and map the results back to every row.
+    
+    Rule files repeat the same rulesets and mappings, so only unique strings are parsed.
+    Each row gets its own copy of the parsed value.
+    """
+    codes, uniques = pd.factorize(values.astype(object))
+    parsed_uniques = parse(pd.Series(uniques, dtype=object)).tolist()
+    return pd.Series(
+        [copy(parsed_uniques[code]) if code >= 0 else copy() for code in codes],
+        index=values.index,
+        dtype=object
+    )
+
+def parse_column_mappings(mappings: pd.Series) -> pd.Series:
+    """Parse R list(key=e$gene_table$column, ...) strings into {key: column} dicts.
+    
+    Rows without a mapping get an empty dict.
+    """
+    return _parse_distinct(mappings, _parse_column_mappings, dict)
+
+def _parse_column_mappings(mappings: pd.Series) -> pd.Series:
+    """Vectorized column mapping parser: all rows are split and cleaned together with string operations"""
+    parsed = pd.Series([{} for _ in range(len(mappings))], index=mappings.index, dtype=object)
+    
+    pairs = _r_list_bodies(mappings).str.split(',').explode()
+    pairs = pairs[pairs.str.contains('=', regex=False, na=False)]
+    if pairs.empty:
+        return parsed
+    
+    key_values = pairs.str.split('=', n=1, expand=True)
+    keys = key_values[0].str.strip()
+    values = (
+        key_values[1].str.strip()
+        .str.replace("e$gene_table$", "", regex=False)
+        .str.replace("'", "", regex=False)
+        .str.replace("\"", "", regex=False)
+    )
+    
+    for row_index, key, value in zip(pairs.index, keys, values):
+        parsed[row_index][key] = value
+    
+    return parsed
+
+def parse_ruleset_conditions(rulesets: pd.Series) -> pd.Series:
+    """Parse R list("condition ~ score", ...) strings into lists of condition strings.
+    
+    Only elements containing '~' are kept. Rows without a ruleset get an empty list.
+    """
+    return _parse_distinct(rulesets, _parse_ruleset_conditions, list)
+
+def _parse_ruleset_conditions(rulesets: pd.Series) -> pd.Series:
+    """Vectorized ruleset parser: elements are split on commas outside single or double
+    quotes with one regex pass, and the quotes around each condition are removed
+    """
+    parsed = pd.Series([[] for _ in range(len(rulesets))], index=rulesets.index, dtype=object)
+    
+    elements = _r_list_bodies(rulesets).str.findall(_R_LIST_ELEMENT).explode()
+    elements = elements[elements.str.contains('~', regex=False, na=False)]
+    elements = elements.str.replace(_R_LEADING_QUOTED, r"\2", regex=True).str.strip()
+    
+    for row_index, condition in zip(elements.index, elements):
+        parsed[row_index].append(condition)
+    
+    return parsed
+
+# Columns read from each rules file format
+TSV_RULE_COLUMNS = ['name', 'rulesetDesc', 'column_mapping_to_ruleset']
+TXT_RULE_COLUMNS = ['name', 'description', 'ruleset', 'column_mapping']
+
+# Tags and fallback conditions shared by every loaded rule; copied per rule on insertion
+_DEFAULT_TAGS = ('example', 'lusc', 'system-loaded')
+_DEFAULT_TAGS_TXT = _DEFAULT_TAGS + ('complete-ruleset',)
+_DEFAULT_CONDITIONS = (
+    "x > 0.5 ~ 6",
+    "x > 0.3 and x <= 0.5 ~ 4",
+    "x > 0.1 and x <= 0.3 ~ 2",
+    "True ~ None"
+)
+
+def read_rules_file(file_path, columns):
+    """Read only the needed columns of a tab-separated rules file.
+    
+    Uses pandas' multithreaded pyarrow parser when pyarrow is installed, and the C
+    parser otherwise.
+    """
+    try:
+        return pd.read_csv(file_path, sep='\t', usecols=columns, engine='pyarrow')
+    except ImportError:
+        return pd.read_csv(file_path, sep='\t', usecols=columns, low_memory=False)
+
+def _rule_records(df, descriptions, tags, ruleset_conditions, column_mappings):
+    """Build the rule dicts for every row with one DataFrame.to_dict('records') call.
+    
+    Rows without a description get "Rule for <name>", rows without conditions get the
+    default conditions and rows without a column mapping map x to the lowercased rule name.
+    """
+    names = df['name']
+    return df[['name']].assign(
+        description=descriptions.fillna('Rule for ' + names.astype(str)),
+        owner_name='System',
+        organization='Example Organization',
+        disease_area_study='LUSC',
+        tags=[list(tags) for _ in range(len(df))],
+        ruleset_conditions=[
+            conditions if conditions else list(_DEFAULT_CONDITIONS) for conditions in ruleset_conditions
+        ],
+        column_mapping=[
+            column_mapping if column_mapping else {"x": name.lower()}
+            for column_mapping, name in zip(column_mappings, names)
+        ],
+        weight=1.0,
+        is_active=True
+    ).to_dict('records')
+
 def load_rules_from_tsv(file_path):
     """Load rules from TSV file"""
-    df = pd.read_csv(file_path, sep='\t')
-    
-    rules = []
-    for _, row in df.iterrows():
-        # Parse column mapping
-        column_mapping = {}
-        if pd.notna(row['column_mapping_to_ruleset']):
-            # Extract variable mappings from R list format
-            mapping_str = row['column_mapping_to_ruleset']
-            if 'list(' in mapping_str:
-                # Simple parsing of R list format
-                mapping_str = mapping_str.replace('list(', '').replace(')', '')
-                # Split by commas and extract key-value pairs
-                pairs = mapping_str.split(',')
-                for pair in pairs:
-                    if '=' in pair:
-                        key, value = pair.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        # Remove e$gene_table$ prefix and quotes
-                        value = value.replace("e$gene_table$", "").replace("'", "").replace("\"", "")
-                        column_mapping[key] = value
-        
-        rule = {
-            'name': row['name'],
-            'description': row['rulesetDesc'] if pd.notna(row['rulesetDesc']) else f"Rule for {row['name']}",
-            'owner_name': 'System',
-            'organization': 'Example Organization',
-            'disease_area_study': 'LUSC',
-            'tags': ['example', 'lusc', 'system-loaded'],
-            'ruleset_conditions': [
-                "x > 0.5 ~ 6",
-                "x > 0.3 and x <= 0.5 ~ 4", 
-                "x > 0.1 and x <= 0.3 ~ 2",
-                "True ~ None"
-            ],  # Default conditions for now
-            'column_mapping': column_mapping if column_mapping else {"x": row['name'].lower()},
-            'weight': 1.0,
-            'is_active': True
-        }
-        rules.append(rule)
+    df = read_rules_file(file_path, TSV_RULE_COLUMNS)
     
-    return rules
+    # Parse column mappings for all rows at once; default conditions for now
+    column_mappings = parse_column_mappings(df['column_mapping_to_ruleset'])
+    
+    return _rule_records(df, df['rulesetDesc'], _DEFAULT_TAGS, [None] * len(df), column_mappings)
 
 def load_rules_from_txt(file_path):
     """Load rules from the original TXT file with complete rule definitions"""
-    df = pd.read_csv(file_path, sep='\t')
-    
-    rules = []
-    for _, row in df.iterrows():
-        # Parse ruleset conditions from R list format
-        conditions = []
-        if pd.notna(row['ruleset']):
-            ruleset_str = row['ruleset']
-            if 'list(' in ruleset_str:
-                # Extract conditions from R list
-                ruleset_str = ruleset_str.replace('list(', '').replace(')', '')
-                # Split by commas but handle quoted strings
-                condition_parts = []
-                current_part = ""
-                in_quotes = False
-                
-                for char in ruleset_str:
-                    if char == '"' or char == "'":
-                        in_quotes = not in_quotes
-                    elif char == ',' and not in_quotes:
-                        condition_parts.append(current_part.strip())
-                        current_part = ""
-                        continue
-                    current_part += char
-                
-                if current_part:
-                    condition_parts.append(current_part.strip())
-                
-                for condition in condition_parts:
-                    if '~' in condition:
-                        conditions.append(condition.strip())
-        
-        # Parse column mapping
-        column_mapping = {}
-        if pd.notna(row['column_mapping']):
-            mapping_str = row['column_mapping']
-            if 'list(' in mapping_str:
-                mapping_str = mapping_str.replace('list(', '').replace(')', '')
-                pairs = mapping_str.split(',')
-                for pair in pairs:
-                    if '=' in pair:
-                        key, value = pair.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        value = value.replace("e$gene_table$", "").replace("'", "").replace("\"", "")
-                        column_mapping[key] = value
-        
-        rule = {
-            'name': row['name'],
-            'description': row['description'] if pd.notna(row['description']) else f"Rule for {row['name']}",
-            'owner_name': 'System',
-            'organization': 'Example Organization',
-            'disease_area_study': 'LUSC',
-            'tags': ['example', 'lusc', 'system-loaded', 'complete-ruleset'],
-            'ruleset_conditions': conditions if conditions else [
-                "x > 0.5 ~ 6",
-                "x > 0.3 and x <= 0.5 ~ 4", 
-                "x > 0.1 and x <= 0.3 ~ 2",
-                "True ~ None"
-            ],
-            'column_mapping': column_mapping if column_mapping else {"x": row['name'].lower()},
-            'weight': 1.0,
-            'is_active': True
-        }
-        rules.append(rule)
+    df = read_rules_file(file_path, TXT_RULE_COLUMNS)
     
-    return rules
+    # Parse ruleset conditions and column mappings for all rows at once
+    ruleset_conditions = parse_ruleset_conditions(df['ruleset'])
+    column_mappings = parse_column_mappings(df['column_mapping'])
+    
+    return _rule_records(df, df['description'], _DEFAULT_TAGS_TXT, ruleset_conditions, column_mappings)
 
 def create_example_rubric(db: Session, rule_ids):
     """Create an example rubric with the loaded rules"""
@@ -147,20 +182,22 @@ def create_example_rubric(db: Session, rule_ids):
         tags=["example", "complete", "lusc"],
         is_active=True
     )
+    # The id is assigned client-side, so a flush is enough; the rubric and its rules
+    # are committed together below without reloading the rubric
     db.add(rubric)
-    db.commit()
-    db.refresh(rubric)
-    
-    # Add rules to rubric with weights
-    for i, rule_id in enumerate(rule_ids):
-        rubric_rule = RubricRule(
-            rubric_id=rubric.id,
-            rule_id=rule_id,
-            weight=1.0,
-            order_index=i,
-            is_active=True
-        )
-        db.add(rubric_rule)
+    db.flush()
+    
+    # Add rules to rubric with weights in one executemany insert
+    db.bulk_insert_mappings(RubricRule, [
+        {
+            'rubric_id': rubric.id,
+            'rule_id': rule_id,
+            'weight': 1.0,
+            'order_index': i,
+            'is_active': True
+        }
+        for i, rule_id in enumerate(rule_ids)
+    ])
     
     db.commit()
     return rubric
@@ -170,21 +207,21 @@ def main():
     # Create database tables
     Base.metadata.create_all(bind=engine)
     
-    db = SessionLocal()
+    # Objects are not reloaded after each commit; the script only reads back what it wrote
+    db = SessionLocal(autoflush=False, expire_on_commit=False)
     
     try:
         # Load rules from the complete TXT file
         print("Loading rules from rules.model.txt...")
         rules_data = load_rules_from_txt('/Users/zayed/Downloads/ai_apps/rubricrunner/models/rules.model.txt')
         
-        rule_ids = []
-        for rule_data in rules_data:
-            rule = Rule(**rule_data)
-            db.add(rule)
-            db.flush()
-            rule_ids.append(rule.id)
+        # Insert all rules in one batched statement, returning their ids in input order
+        rule_ids = db.scalars(
+            insert(Rule).returning(Rule.id, sort_by_parameter_order=True),
+            rules_data
+        ).all()
         
-        db.commit()
+        # Committed together with the rubric below
         print(f"Loaded {len(rule_ids)} rules successfully")
         
         # Create example rubric
@@ -199,7 +236,14 @@ def main():
         
         src_file = '/Users/zayed/Downloads/ai_apps/rubricrunner/data/lusc_input.xlsx'
         dst_file = os.path.join(uploads_dir, 'lusc_example_data.xlsx')
-        shutil.copy2(src_file, dst_file)
+        # Hard link the file (no bytes copied); fall back to a plain content copy,
+        # e.g. across filesystems. Metadata is not needed for the working copy.
+        if os.path.lexists(dst_file):
+            os.remove(dst_file)
+        try:
+            os.link(src_file, dst_file)
+        except OSError:
+            shutil.copyfile(src_file, dst_file)
         print(f"Copied example data to {dst_file}")
         
         # Create a project with the example data
@@ -12,21 +12,46 @@ This script provides various operations for managing histograms:
 import sys
 import os
 import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 # Add the backend directory to the Python path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models.database import get_db
 from app.models.dataset import Dataset, DatasetColumn, DatasetHistogram
 from app.services.dataset_processor import DatasetProcessor
 
+# Number of processed datasets whose histograms are committed together
+HISTOGRAM_COMMIT_BATCH_SIZE = 16
+
+# Below this many datasets, histograms are computed in this process instead of worker processes
+PARALLEL_MIN_DATASETS = 4
+
+def get_histogram_counts(db: Session):
+    """Return ({dataset_id: numeric column count}, {dataset_id: histogram count}) from two GROUP BY queries"""
+    numeric_column_counts = dict(
+        db.query(DatasetColumn.dataset_id, func.count(DatasetColumn.id)).filter(
+            DatasetColumn.column_type.in_(['numeric', 'score'])
+        ).group_by(DatasetColumn.dataset_id).all()
+    )
+    histogram_counts = dict(
+        db.query(DatasetHistogram.dataset_id, func.count(DatasetHistogram.id)).group_by(
+            DatasetHistogram.dataset_id
+        ).all()
+    )
+    return numeric_column_counts, histogram_counts
+
 def list_datasets_with_histogram_status(db: Session):
     """List all datasets with their histogram status"""
     
     datasets = db.query(Dataset).all()
+    numeric_column_counts, histogram_counts = get_histogram_counts(db)
     
     print("📊 Dataset Histogram Status:")
     print("=" * 80)
@@ -34,16 +59,8 @@ def list_datasets_with_histogram_status(db: Session):
     print("-" * 80)
     
     for dataset in datasets:
-        # Count numeric columns
-        numeric_columns = db.query(DatasetColumn).filter(
-            DatasetColumn.dataset_id == dataset.id,
-            DatasetColumn.column_type.in_(['numeric', 'score'])
-        ).count()
-        
-        # Count histograms
-        histogram_count = db.query(DatasetHistogram).filter(
-            DatasetHistogram.dataset_id == dataset.id
-        ).count()
+        numeric_columns = numeric_column_counts.get(dataset.id, 0)
+        histogram_count = histogram_counts.get(dataset.id, 0)
         
         # Determine status
         if numeric_columns == 0:
@@ -57,59 +74,138 @@ def list_datasets_with_histogram_status(db: Session):
         
         print(f"{dataset.name[:29]:<30} {dataset.id[:11]:<12} {numeric_columns:<12} {histogram_count:<12} {status}")
 
+def get_numeric_columns(db: Session, dataset_ids):
+    """Return {dataset_id: [(column_id, original_name), ...]} for the numeric columns of the given datasets"""
+    numeric_columns = defaultdict(list)
+    for dataset_id, column_id, original_name in db.query(
+        DatasetColumn.dataset_id, DatasetColumn.id, DatasetColumn.original_name
+    ).filter(
+        DatasetColumn.dataset_id.in_(dataset_ids),
+        DatasetColumn.column_type.in_(['numeric', 'score'])
+    ):
+        numeric_columns[dataset_id].append((column_id, original_name))
+    return numeric_columns
+
+def _write_histograms(db: Session, dataset_id: str, histogram_rows, delete_existing: bool):
+    """Replace a dataset's histograms with the computed rows, without committing"""
+    if delete_existing:
+        db.query(DatasetHistogram).filter(
+            DatasetHistogram.dataset_id == dataset_id
+        ).delete()
+    
+    if histogram_rows:
+        # One executemany insert of the computed rows
+        db.bulk_insert_mappings(DatasetHistogram, histogram_rows)
+
+def _commit_histogram_batch(db: Session, batch):
+    """Write and commit a batch of (dataset, histogram rows, delete existing) in one transaction.
+    
+    If the batch fails it is rolled back and its datasets are retried one transaction
+    each, so a failing dataset only loses its own changes. Returns the number of datasets
+    with histograms and the number of histograms that were committed.
+    """
+    try:
+        for dataset, histogram_rows, delete_existing in batch:
+            _write_histograms(db, dataset.id, histogram_rows, delete_existing)
+        db.commit()
+        committed = [histogram_rows for _, histogram_rows, _ in batch]
+    except Exception:
+        db.rollback()
+        
+        committed = []
+        for dataset, histogram_rows, delete_existing in batch:
+            try:
+                _write_histograms(db, dataset.id, histogram_rows, delete_existing)
+                db.commit()
+                committed.append(histogram_rows)
+            except Exception as e:
+                db.rollback()
+                print(f"  ❌ Error saving histograms for {dataset.name}: {e}")
+    
+    committed = [histogram_rows for histogram_rows in committed if histogram_rows]
+    return len(committed), sum(len(histogram_rows) for histogram_rows in committed)
+
 def generate_missing_histograms(db: Session, processor: DatasetProcessor, bin_count: int = 30, force: bool = False):
     """Generate histograms for datasets that are missing them"""
     
     datasets = db.query(Dataset).all()
+    numeric_column_counts, histogram_counts = get_histogram_counts(db)
     processed_count = 0
     total_histograms = 0
     
+    # Datasets whose histograms are written and committed together
+    batch = []
+    
+    datasets_to_process = []
     for dataset in datasets:
-        # Count numeric columns
-        numeric_columns = db.query(DatasetColumn).filter(
-            DatasetColumn.dataset_id == dataset.id,
-            DatasetColumn.column_type.in_(['numeric', 'score'])
-        ).count()
+        numeric_columns = numeric_column_counts.get(dataset.id, 0)
         
         if numeric_columns == 0:
             continue
         
-        # Count existing histograms
-        existing_histograms = db.query(DatasetHistogram).filter(
-            DatasetHistogram.dataset_id == dataset.id
-        ).count()
+        existing_histograms = histogram_counts.get(dataset.id, 0)
         
         # Skip if histograms exist and not forcing regeneration
         if existing_histograms > 0 and not force:
             continue
         
-        print(f"🔄 Processing dataset: {dataset.name}")
+        datasets_to_process.append(dataset)
+    
+    columns_by_dataset = get_numeric_columns(db, [dataset.id for dataset in datasets_to_process])
+    
+    # Histograms are computed from the pickled datasets without the database, in worker
+    # processes when there are enough datasets; only this process writes to the database
+    executor = ProcessPoolExecutor() if len(datasets_to_process) >= PARALLEL_MIN_DATASETS else None
+    try:
+        if executor is not None:
+            jobs = [
+                executor.submit(processor.compute_histograms, dataset.id, columns_by_dataset[dataset.id], bin_count).result
+                for dataset in datasets_to_process
+            ]
+        else:
+            jobs = [
+                partial(processor.compute_histograms, dataset.id, columns_by_dataset[dataset.id], bin_count)
+                for dataset in datasets_to_process
+            ]
         
-        try:
-            if force and existing_histograms > 0:
-                # Delete existing histograms first
-                db.query(DatasetHistogram).filter(
-                    DatasetHistogram.dataset_id == dataset.id
-                ).delete()
-                print(f"  🗑️  Deleted {existing_histograms} existing histograms")
+        for dataset, job in zip(datasets_to_process, jobs):
+            existing_histograms = histogram_counts.get(dataset.id, 0)
             
-            # Generate new histograms
-            histograms = processor.generate_histograms_for_dataset(db, dataset.id, bin_count)
+            print(f"🔄 Processing dataset: {dataset.name}")
             
-            if histograms:
-                for histogram in histograms:
-                    db.add(histogram)
-                db.commit()
-                
-                print(f"  ✅ Generated {len(histograms)} histograms")
-                total_histograms += len(histograms)
-                processed_count += 1
+            try:
+                histogram_rows = job()
+            except Exception as e:
+                print(f"  ❌ Error: {e}")
+                continue
+            
+            delete_existing = force and existing_histograms > 0
+            if delete_existing:
+                # Existing histograms are deleted first, when the batch is written
+                print(f"  🗑️  Deleting {existing_histograms} existing histograms")
+            
+            if histogram_rows:
+                print(f"  ✅ Generated {len(histogram_rows)} histograms")
             else:
                 print(f"  ⚠️  No histograms generated (no valid numeric data)")
-                
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
-            db.rollback()
+            
+            if histogram_rows or delete_existing:
+                batch.append((dataset, histogram_rows, delete_existing))
+            
+            # Commit in batches of datasets rather than once per dataset
+            if len(batch) >= HISTOGRAM_COMMIT_BATCH_SIZE:
+                committed_datasets, committed_histograms = _commit_histogram_batch(db, batch)
+                processed_count += committed_datasets
+                total_histograms += committed_histograms
+                batch = []
+        
+        if batch:
+            committed_datasets, committed_histograms = _commit_histogram_batch(db, batch)
+            processed_count += committed_datasets
+            total_histograms += committed_histograms
+    finally:
+        if executor is not None:
+            executor.shutdown()
     
     print(f"\n📊 Summary: Processed {processed_count} datasets, generated {total_histograms} histograms")
     return processed_count, total_histograms
@@ -140,8 +236,8 @@ def regenerate_histograms_for_dataset(db: Session, processor: DatasetProcessor,
         histograms = processor.generate_histograms_for_dataset(db, dataset_id, bin_count)
         
         if histograms:
-            for histogram in histograms:
-                db.add(histogram)
+            # One bulk insert instead of per-object unit-of-work bookkeeping
+            db.bulk_save_objects(histograms)
             db.commit()
             
             print(f"  ✅ Generated {len(histograms)} new histograms")
@@ -9,6 +9,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy import text
+from app.models.database import sqlite_migration_pragmas
 from app.models.result_database import result_engine, ResultBase
 from app.models.result_analysis_result import AnalysisResult
 import logging
@@ -24,34 +25,33 @@ def migrate_add_analysis_name():
     try:
         with engine.connect() as conn:
             # Check if name column already exists
-            result = conn.execute(text("""
-                SELECT COUNT(*) as count 
-                FROM pragma_table_info('analysis_results') 
-                WHERE name = 'name'
-            """))
-            
-            column_exists = result.fetchone()[0] > 0
+            columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(analysis_results)")}
+            column_exists = 'name' in columns
             
             if column_exists:
                 logger.info("Column 'name' already exists in analysis_results table")
                 return
             
-            # Add the name column
-            logger.info("Adding 'name' column to analysis_results table...")
-            conn.execute(text("""
-                ALTER TABLE analysis_results 
-                ADD COLUMN name VARCHAR(200)
-            """))
+            # Leave the implicit transaction of the column check
+            conn.commit()
             
-            # Update existing records with default names
-            logger.info("Updating existing analysis results with default names...")
-            conn.execute(text("""
-                UPDATE analysis_results 
-                SET name = 'Analysis ' || substr(id, 1, 8) || ' - ' || datetime(created_date, 'localtime')
-                WHERE name IS NULL
-            """))
+            with sqlite_migration_pragmas(conn):
+                # Add the column and backfill it in one transaction
+                with conn.begin():
+                    logger.info("Adding 'name' column to analysis_results table...")
+                    conn.execute(text("""
+                        ALTER TABLE analysis_results 
+                        ADD COLUMN name VARCHAR(200)
+                    """))
+                    
+                    # Update existing records with default names; the column was just
+                    # added, so every row is NULL and needs no filter
+                    logger.info("Updating existing analysis results with default names...")
+                    conn.execute(text("""
+                        UPDATE analysis_results 
+                        SET name = 'Analysis ' || substr(id, 1, 8) || ' - ' || datetime(created_date, 'localtime')
+                    """))
             
-            conn.commit()
             logger.info("Successfully added 'name' column to analysis_results table")
             
     except Exception as e:
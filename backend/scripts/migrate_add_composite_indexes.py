@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes used by permission and dataset lookups.
+
+This script creates the indexes declared on the UserViewPermission, UserPermissionGroup,
+DatasetColumn and DatasetHistogram models in existing databases, then runs ANALYZE so
+the query planner uses them. It's safe to run multiple times and will not affect existing data.
+"""
+
+import sqlite3
+import sys
+import os
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Index name -> (table, columns); names match the model __table_args__
+COMPOSITE_INDEXES = {
+    "ix_user_view_permissions_user_active": ("user_view_permissions", ("user_id", "is_active")),
+    "ix_user_permission_groups_user_active": ("user_permission_groups", ("user_id", "is_active")),
+    "ix_dataset_columns_dataset_type": ("dataset_columns", ("dataset_id", "column_type")),
+    "idx_dataset_histograms_dataset_id": ("dataset_histograms", ("dataset_id",)),
+}
+
+def create_composite_indexes(db_path: str = "backend/rubrics.db"):
+    """Create the composite indexes and refresh planner statistics"""
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        existing_tables = {
+            row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        }
+        
+        for index_name, (table, columns) in COMPOSITE_INDEXES.items():
+            if table not in existing_tables:
+                print(f"⚠️  Table '{table}' does not exist. Skipping {index_name}.")
+                continue
+            
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({', '.join(columns)})"
+            )
+            print(f"✅ Index {index_name} on {table} ({', '.join(columns)})")
+        
+        conn.commit()
+        
+        # Update statistics so the query planner picks the new indexes
+        cursor.execute("ANALYZE")
+        conn.commit()
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error creating indexes: {e}")
+        conn.rollback()
+        return False
+        
+    finally:
+        conn.close()
+
+def main():
+    """Main migration function"""
+    
+    print("🚀 Starting composite index migration...")
+    
+    # Check if database file exists
+    db_path = "backend/rubrics.db"
+    if not os.path.exists(db_path):
+        print(f"❌ Database file '{db_path}' not found.")
+        print("Please run this script from the project root directory.")
+        return False
+    
+    if not create_composite_indexes(db_path):
+        return False
+    
+    print("🎉 Composite index migration completed successfully!")
+    
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -2,50 +2,29 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import text
-from app.models.database import engine
+from app.models.database import engine, sqlite_migration_pragmas
+
+# Admin control columns added to each table
+ADMIN_COLUMNS = (
+    ("visibility", "VARCHAR(20) DEFAULT 'public'"),
+    ("enabled", "BOOLEAN DEFAULT 1"),
+)
+ADMIN_TABLES = ("rules", "rubrics", "datasets")
 
 def migrate_admin_attributes():
     """Add visibility and enabled columns to existing tables"""
     print("Starting migration to add admin control attributes...")
     
-    with engine.connect() as conn:
-        # Start a transaction
+    with engine.connect() as conn, sqlite_migration_pragmas(conn):
+        # Start a transaction; all ALTERs are applied together
         trans = conn.begin()
         
         try:
-            # Add columns to rules table
-            print("Adding admin columns to rules table...")
-            conn.execute(text("""
-                ALTER TABLE rules 
-                ADD COLUMN visibility VARCHAR(20) DEFAULT 'public'
-            """))
-            conn.execute(text("""
-                ALTER TABLE rules 
-                ADD COLUMN enabled BOOLEAN DEFAULT 1
-            """))
-            
-            # Add columns to rubrics table
-            print("Adding admin columns to rubrics table...")
-            conn.execute(text("""
-                ALTER TABLE rubrics 
-                ADD COLUMN visibility VARCHAR(20) DEFAULT 'public'
-            """))
-            conn.execute(text("""
-                ALTER TABLE rubrics 
-                ADD COLUMN enabled BOOLEAN DEFAULT 1
-            """))
-            
-            # Add columns to datasets table
-            print("Adding admin columns to datasets table...")
-            conn.execute(text("""
-                ALTER TABLE datasets 
-                ADD COLUMN visibility VARCHAR(20) DEFAULT 'public'
-            """))
-            conn.execute(text("""
-                ALTER TABLE datasets 
-                ADD COLUMN enabled BOOLEAN DEFAULT 1
-            """))
+            for table in ADMIN_TABLES:
+                print(f"Adding admin columns to {table} table...")
+                # SQLite only accepts one ADD COLUMN per ALTER TABLE
+                for column, ddl in ADMIN_COLUMNS:
+                    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
             
             # Commit the transaction
             trans.commit()
@@ -64,21 +43,10 @@ def check_migration_status():
     
     with engine.connect() as conn:
         try:
-            # Check if visibility column exists in rules table
-            result = conn.execute(text("""
-                SELECT COUNT(*) as count 
-                FROM pragma_table_info('rules') 
-                WHERE name = 'visibility'
-            """))
-            visibility_exists = result.fetchone()[0] > 0
-            
-            # Check if enabled column exists in rules table
-            result = conn.execute(text("""
-                SELECT COUNT(*) as count 
-                FROM pragma_table_info('rules') 
-                WHERE name = 'enabled'
-            """))
-            enabled_exists = result.fetchone()[0] > 0
+            # Check if visibility and enabled columns exist in rules table
+            columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(rules)")}
+            visibility_exists = 'visibility' in columns
+            enabled_exists = 'enabled' in columns
             
             if visibility_exists and enabled_exists:
                 print("Migration already applied - admin columns exist in rules table")
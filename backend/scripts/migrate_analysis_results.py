@@ -14,8 +14,8 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from sqlalchemy import create_engine, text
-from app.models.database import DATABASE_URL, Base
+from sqlalchemy import text
+from app.models.database import Base, engine
 from app.models.analysis_result import AnalysisResult, AnalysisResultDetail
 
 def migrate_analysis_results():
@@ -23,36 +23,11 @@ def migrate_analysis_results():
     
     print("Starting analysis results migration...")
     
-    # Create engine
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    
     try:
-        # Check if tables already exist
-        with engine.connect() as conn:
-            # Check if analysis_results table exists
-            result = conn.execute(text("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='analysis_results'
-            """))
-            analysis_results_exists = result.fetchone() is not None
-            
-            # Check if analysis_result_details table exists
-            result = conn.execute(text("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='analysis_result_details'
-            """))
-            analysis_details_exists = result.fetchone() is not None
-            
-            if analysis_results_exists and analysis_details_exists:
-                print("Analysis results tables already exist. Skipping migration.")
-                return True
-        
-        # Create tables
-        print("Creating analysis_results table...")
-        AnalysisResult.__table__.create(engine, checkfirst=True)
-        
-        print("Creating analysis_result_details table...")
-        AnalysisResultDetail.__table__.create(engine, checkfirst=True)
+        # Create both tables on one connection, in foreign key order; create_all's
+        # checkfirst skips tables that already exist
+        print("Creating analysis_results and analysis_result_details tables...")
+        Base.metadata.create_all(engine, tables=[AnalysisResult.__table__, AnalysisResultDetail.__table__])
         
         print("✅ Analysis results migration completed successfully!")
         
@@ -77,8 +52,6 @@ def rollback_analysis_results():
     
     print("Rolling back analysis results migration...")
     
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    
     try:
         with engine.connect() as conn:
             # Drop tables in reverse order (due to foreign key constraints)
@@ -11,16 +11,24 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from operator import attrgetter
 
 # Add the backend directory to the Python path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from app.models.database import engine, Base, SessionLocal
+from app.models.database import (
+    engine, Base, SessionLocal,
+    SQLITE_BULK_PRAGMAS, SQLITE_DEFAULT_PRAGMAS, SQLITE_WAL_PRAGMA, set_sqlite_pragmas
+)
 from app.models.result_database import result_engine, ResultBase, ResultSessionLocal
 from app.models.analysis_result import AnalysisResult as OldAnalysisResult, AnalysisResultDetail
 from app.models.result_analysis_result import AnalysisResult, AnalysisResultTracker, create_rubric_analysis_table
-from sqlalchemy import text
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.schema import CreateTable
 
 def create_result_database():
     """Create the new result database and tables"""
@@ -28,114 +36,263 @@ def create_result_database():
     ResultBase.metadata.create_all(bind=result_engine)
     print("✓ Result database tables created")
 
+# Analysis result columns copied unchanged from the main database
+ANALYSIS_RESULT_COLUMNS = [
+    'id', 'project_id', 'rubric_id', 'dataset_id', 'created_date', 'modified_date',
+    'total_genes_processed', 'total_rules_executed', 'execution_time_seconds',
+    'status', 'error_message', 'results_file'
+]
+
+# Wide format rows inserted per executemany batch
+WIDE_ROW_BATCH_SIZE = 10000
+
+def _wide_table_insert(connection, table):
+    """Return the INSERT statement, with all columns in table order, for loading a wide table"""
+    preparer = connection.dialect.identifier_preparer
+    columns = table.columns.keys()
+    return (
+        f"INSERT INTO {preparer.quote(table.name)} ({', '.join(preparer.quote(column) for column in columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+
+def _wide_table_rows(table, wide_df, analysis_result_id):
+    """Return the parameter tuples for loading pivoted rows into a wide table.
+    
+    id and created_date are filled in here, as their Python-side column defaults are
+    not applied to raw driver SQL. Missing values are bound as NULL.
+    """
+    columns = list(table.columns.keys())
+    values = wide_df.assign(
+        id=[uuid.uuid4().hex for _ in range(len(wide_df))],
+        analysis_result_id=analysis_result_id,
+        # Same text format SQLAlchemy's SQLite DateTime type stores
+        created_date=datetime.utcnow().isoformat(" ", timespec="microseconds")
+    ).reindex(columns=columns).astype(object)
+    values = values.where(values.notna(), None)
+    
+    return list(values.itertuples(index=False, name=None))
+
+def _pivot_details(details, rule_column_names):
+    """Pivot one result's long format detail rows into a DataFrame with one row per gene.
+    
+    Returns (wide DataFrame, rule names). Each gene's key_column_2_value and total_score
+    come from its first detail, a repeated (gene, rule) pair keeps its last detail, and
+    rules without a detail for a gene are left missing. rule_column_names caches the
+    wide column names of each rule name.
+    """
+    df = pd.DataFrame.from_records(details, columns=DETAIL_COLUMNS)
+    
+    rule_names = df['rule_name'].unique().tolist()
+    for rule_name in rule_names:
+        if rule_name not in rule_column_names:
+            rule_column_names[rule_name] = _rule_column_names(rule_name)
+    
+    scores = df.drop_duplicates(['key_column_value', 'rule_name'], keep='last').pivot(
+        index='key_column_value',
+        columns='rule_name',
+        values=list(DETAIL_VALUE_COLUMNS)
+    )
+    # Flatten the (value, rule name) columns to the wide column names
+    scores.columns = [
+        rule_column_names[rule_name][DETAIL_VALUE_COLUMNS.index(value_column)]
+        for value_column, rule_name in scores.columns
+    ]
+    # Rule names that sanitize to the same column are merged, keeping the last value
+    # present for each gene
+    if scores.columns.has_duplicates:
+        scores = scores.T.groupby(level=0, sort=False).last().T
+    
+    genes = df.drop_duplicates('key_column_value').set_index('key_column_value')[
+        ['key_column_2_value', 'total_score']
+    ]
+    return genes.join(scores).reset_index(), rule_names
+
+def _rule_column_names(rule_name):
+    """Return the wide table (score, weight, weighted score) column names of a rule"""
+    safe_rule_name = rule_name.replace(' ', '_').replace('-', '_').replace('.', '_').replace('(', '').replace(')', '')
+    safe_rule_name = ''.join(c for c in safe_rule_name if c.isalnum() or c == '_')
+    if safe_rule_name[0].isdigit():
+        safe_rule_name = f"rule_{safe_rule_name}"
+    return f"{safe_rule_name}_score", f"{safe_rule_name}_weight", f"{safe_rule_name}_weighted_score"
+
+# Detail columns read for the long to wide conversion, and the per-rule values among them
+# in wide column order (score, weight, weighted score)
+DETAIL_COLUMNS = [
+    'analysis_result_id', 'key_column_value', 'key_column_2_value', 'total_score',
+    'rule_name', 'rule_score', 'rule_weight', 'weighted_score'
+]
+DETAIL_VALUE_COLUMNS = ('rule_score', 'rule_weight', 'weighted_score')
+
+def _details_by_result(main_db):
+    """Stream all analysis result details with one query, yielding (analysis_result_id, details) in id order"""
+    details = main_db.query(
+        *(getattr(AnalysisResultDetail, column) for column in DETAIL_COLUMNS)
+    ).order_by(
+        AnalysisResultDetail.analysis_result_id,
+        AnalysisResultDetail.key_column_value
+    ).yield_per(10000)
+    
+    for analysis_result_id, result_details in groupby(details, key=attrgetter('analysis_result_id')):
+        yield analysis_result_id, list(result_details)
+
+# Below this many analysis results, details are pivoted in this process instead of worker processes
+PARALLEL_MIN_RESULTS = 4
+
+# Pivots submitted to worker processes ahead of the result being written
+PIVOTS_IN_FLIGHT = 2 * (os.cpu_count() or 1)
+
+def _pivoted_details(detail_groups, executor=None):
+    """Pivot streamed detail groups, yielding (analysis_result_id, detail count, (wide DataFrame, rule names)) in order.
+    
+    With an executor the pivots run in worker processes, at most PIVOTS_IN_FLIGHT ahead of
+    the result being consumed, so only a bounded number of results is held in memory.
+    """
+    rule_column_names = {}
+    if executor is None:
+        for analysis_result_id, details in detail_groups:
+            yield analysis_result_id, len(details), _pivot_details(details, rule_column_names)
+        return
+    
+    pending = deque()
+    for analysis_result_id, details in detail_groups:
+        # Plain tuples are sent to the workers rather than result rows
+        future = executor.submit(_pivot_details, [tuple(detail) for detail in details], rule_column_names)
+        pending.append((analysis_result_id, len(details), future))
+        if len(pending) >= PIVOTS_IN_FLIGHT:
+            analysis_result_id, detail_count, future = pending.popleft()
+            yield analysis_result_id, detail_count, future.result()
+    
+    while pending:
+        analysis_result_id, detail_count, future = pending.popleft()
+        yield analysis_result_id, detail_count, future.result()
+
 def migrate_analysis_results():
     """Migrate analysis results from main database to result database"""
     print("Starting migration of analysis results...")
     
-    # Get database sessions
+    # Get database sessions; the result session runs on one connection tuned for the bulk
+    # load, with the main database attached so rows can be copied inside SQLite
     main_db = SessionLocal()
-    result_db = ResultSessionLocal()
+    result_conn = result_engine.connect()
+    if result_conn.dialect.name == "sqlite":
+        print("Switching the result database to WAL journaling (kept after the migration)")
+    set_sqlite_pragmas(result_conn, [SQLITE_WAL_PRAGMA] + SQLITE_BULK_PRAGMAS)
+    result_conn.exec_driver_sql("ATTACH DATABASE ? AS main_src", (engine.url.database,))
+    result_conn.commit()
+    result_db = ResultSessionLocal(bind=result_conn)
+    executor = None
     
     try:
-        # Get all analysis results from main database
-        old_results = main_db.query(OldAnalysisResult).all()
-        print(f"Found {len(old_results)} analysis results to migrate")
+        # Stream the ids and rubrics of all analysis results from main database
+        result_count = main_db.query(OldAnalysisResult.id).count()
+        print(f"Found {result_count} analysis results to migrate")
+        old_results = main_db.query(
+            OldAnalysisResult.id, OldAnalysisResult.rubric_id
+        ).order_by(OldAnalysisResult.id).yield_per(500)
         
-        for old_result in old_results:
-            print(f"Migrating analysis result {old_result.id}...")
-            
-            # Create new analysis result in result database
-            new_result = AnalysisResult(
-                id=old_result.id,
-                project_id=old_result.project_id,
-                rubric_id=old_result.rubric_id,
-                dataset_id=old_result.dataset_id,
-                created_date=old_result.created_date,
-                modified_date=old_result.modified_date,
-                total_genes_processed=old_result.total_genes_processed,
-                total_rules_executed=old_result.total_rules_executed,
-                execution_time_seconds=old_result.execution_time_seconds,
-                status=old_result.status,
-                error_message=old_result.error_message,
-                results_file=old_result.results_file,
-                key_column="gene_symbol",  # Default key column
-                results_table_name=None  # Will be set after creating wide table
+        # Detail records of all results, streamed by one query in the same id order and
+        # pivoted to wide format, in worker processes when there are enough results; only
+        # this process writes to the result database
+        executor = ProcessPoolExecutor() if result_count >= PARALLEL_MIN_RESULTS else None
+        detail_groups = _pivoted_details(_details_by_result(main_db), executor)
+        next_group = next(detail_groups, None)
+        
+        # Wide tables written by this migration and their INSERT statements, by name
+        wide_tables = {}
+        insert_statements = {}
+        
+        # (results_table_name, id) of the results stored in a wide table
+        results_table_names = []
+        
+        # Migrate everything in one transaction: a single commit (and fsync) at the end,
+        # and a failure leaves the result database untouched
+        with result_db.begin():
+            # Copy all analysis result rows with one INSERT ... SELECT from the attached
+            # main database; results_table_name is filled in below
+            header_columns = ", ".join(ANALYSIS_RESULT_COLUMNS)
+            result_db.connection().exec_driver_sql(
+                f"INSERT INTO analysis_results ({header_columns}, key_column) "
+                f"SELECT {header_columns}, 'gene_symbol' FROM main_src.analysis_results"
             )
             
-            result_db.add(new_result)
-            result_db.flush()  # Get the ID without committing
-            
-            # Get all detail records for this analysis result
-            details = main_db.query(AnalysisResultDetail).filter(
-                AnalysisResultDetail.analysis_result_id == old_result.id
-            ).all()
-            
-            if details:
-                print(f"  Converting {len(details)} detail records to wide format...")
+            for old_result in old_results:
+                print(f"Migrating analysis result {old_result.id}...")
                 
-                # Group details by key column value (gene)
-                gene_data = {}
-                rule_names = set()
+                # Get the pivoted detail records of this analysis result, skipping details
+                # of results that no longer exist
+                while next_group is not None and next_group[0] < old_result.id:
+                    next_group = next(detail_groups, None)
+                detail_count = 0
+                if next_group is not None and next_group[0] == old_result.id:
+                    _, detail_count, (wide_df, rule_names) = next_group
+                    next_group = next(detail_groups, None)
                 
-                for detail in details:
-                    key_value = detail.key_column_value
-                    rule_name = detail.rule_name
-                    rule_names.add(rule_name)
+                if detail_count:
+                    print(f"  Converting {detail_count} detail records to wide format...")
                     
-                    if key_value not in gene_data:
-                        gene_data[key_value] = {
-                            'key_column_value': key_value,
-                            'key_column_2_value': detail.key_column_2_value,
-                            'total_score': detail.total_score,
-                            'analysis_result_id': new_result.id
-                        }
+                    # Create wide format table for this rubric
+                    table_class, table_name = create_rubric_analysis_table(old_result.rubric_id, list(rule_names))
                     
-                    # Store rule-specific data
-                    safe_rule_name = rule_name.replace(' ', '_').replace('-', '_').replace('.', '_').replace('(', '').replace(')', '')
-                    safe_rule_name = ''.join(c for c in safe_rule_name if c.isalnum() or c == '_')
-                    if safe_rule_name[0].isdigit():
-                        safe_rule_name = f"rule_{safe_rule_name}"
+                    # Create the table on the session's connection without its indexes;
+                    # they are built once after all rows are loaded instead of being
+                    # updated on every insert
+                    table = table_class.__table__
+                    connection = result_db.connection()
+                    if table.name not in wide_tables:
+                        if not inspect(connection).has_table(table.name):
+                            connection.execute(CreateTable(table))
+                        insert_statements[table.name] = _wide_table_insert(connection, table)
+                    wide_tables[table.name] = table
+                    results_table_names.append((table_name, old_result.id))
                     
-                    gene_data[key_value][f"{safe_rule_name}_score"] = detail.rule_score
-                    gene_data[key_value][f"{safe_rule_name}_weight"] = detail.rule_weight
-                    gene_data[key_value][f"{safe_rule_name}_weighted_score"] = detail.weighted_score
-                
-                # Create wide format table for this rubric
-                table_class, table_name = create_rubric_analysis_table(old_result.rubric_id, list(rule_names))
-                
-                # Create the table in the database
-                table_class.__table__.create(result_engine, checkfirst=True)
-                
-                # Insert data into wide format table
-                for gene_data_row in gene_data.values():
-                    wide_row = table_class(**gene_data_row)
-                    result_db.add(wide_row)
-                
-                # Update the analysis result with table name
-                new_result.results_table_name = table_name
+                    # Insert data into wide format table in executemany batches of plain
+                    # tuples, through the table's INSERT statement built once
+                    wide_rows = _wide_table_rows(table, wide_df, old_result.id)
+                    for start in range(0, len(wide_rows), WIDE_ROW_BATCH_SIZE):
+                        connection.exec_driver_sql(insert_statements[table.name], wide_rows[start:start + WIDE_ROW_BATCH_SIZE])
+                    
+                    print(f"  ✓ Created wide table '{table_name}' with {len(wide_df)} genes and {len(rule_names)} rules")
                 
-                # Create tracker entry
-                tracker = AnalysisResultTracker(
-                    analysis_result_id=new_result.id,
-                    storage_type="wide_table",
-                    storage_location=table_name
+                print(f"  ✓ Migrated analysis result {old_result.id}")
+            
+            # Point the results at their wide tables and create their tracker entries, each
+            # with one executemany statement
+            if results_table_names:
+                result_db.connection().exec_driver_sql(
+                    "UPDATE analysis_results SET results_table_name = ? WHERE id = ?",
+                    results_table_names
                 )
-                result_db.add(tracker)
-                
-                print(f"  ✓ Created wide table '{table_name}' with {len(gene_data)} genes and {len(rule_names)} rules")
+                result_db.execute(insert(AnalysisResultTracker), [
+                    {
+                        "analysis_result_id": analysis_result_id,
+                        "storage_type": "wide_table",
+                        "storage_location": table_name
+                    }
+                    for table_name, analysis_result_id in results_table_names
+                ])
             
-            result_db.commit()
-            print(f"  ✓ Migrated analysis result {old_result.id}")
+            # Build the wide table indexes over the loaded data; checkfirst skips indexes
+            # of tables that already had them
+            for table in wide_tables.values():
+                print(f"  Creating indexes on '{table.name}'...")
+                for index in table.indexes:
+                    index.create(result_db.connection(), checkfirst=True)
         
-        print(f"✓ Successfully migrated {len(old_results)} analysis results")
+        print(f"✓ Successfully migrated {result_count} analysis results")
         
     except Exception as e:
-        result_db.rollback()
         print(f"✗ Error during migration: {str(e)}")
         raise
     finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
         main_db.close()
         result_db.close()
+        # Pooled connections must not keep the attached database or the relaxed settings
+        result_conn.exec_driver_sql("DETACH DATABASE main_src")
+        result_conn.commit()
+        set_sqlite_pragmas(result_conn, SQLITE_DEFAULT_PRAGMAS)
+        result_conn.close()
 
 def create_indexes():
     """Create additional indexes for performance"""
@@ -169,6 +326,9 @@ def create_indexes():
     finally:
         result_db.close()
 
+# Wide tables counted per UNION ALL query in verify_migration
+WIDE_TABLE_COUNT_CHUNK_SIZE = 400
+
 def verify_migration():
     """Verify the migration was successful"""
     print("Verifying migration...")
@@ -194,14 +354,19 @@ def verify_migration():
             SELECT name FROM sqlite_master 
             WHERE type='table' AND name LIKE 'rubric_%_analysis_result'
         """))
-        wide_tables = cursor.fetchall()
+        wide_tables = [table_name for (table_name,) in cursor.fetchall()]
         print(f"✓ Created {len(wide_tables)} wide format tables")
         
-        for table in wide_tables:
-            table_name = table[0]
-            cursor = result_db.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
-            count = cursor.fetchone()[0]
-            print(f"  - {table_name}: {count} genes")
+        # Count the rows of all wide tables with one UNION ALL query per chunk of tables
+        # (SQLite allows at most 500 terms in a compound SELECT)
+        preparer = result_db.get_bind().dialect.identifier_preparer
+        for start in range(0, len(wide_tables), WIDE_TABLE_COUNT_CHUNK_SIZE):
+            count_sql = " UNION ALL ".join(
+                f"SELECT '{table_name.replace(chr(39), chr(39) * 2)}', COUNT(*) FROM {preparer.quote(table_name)}"
+                for table_name in wide_tables[start:start + WIDE_TABLE_COUNT_CHUNK_SIZE]
+            )
+            for table_name, count in result_db.execute(text(count_sql)):
+                print(f"  - {table_name}: {count} genes")
         
     except Exception as e:
         print(f"✗ Error during verification: {str(e)}")
@@ -210,22 +375,38 @@ def verify_migration():
         main_db.close()
         result_db.close()
 
+# Old analysis result tables and the backup table each is copied to
+BACKUP_TABLES = [
+    ('analysis_results', 'analysis_results_backup'),
+    ('analysis_result_details', 'analysis_result_details_backup'),
+]
+
 def backup_old_tables():
-    """Create backup of old analysis result tables"""
+    """Create backup of old analysis result tables
+    
+    The backup tables are created empty and then filled by INSERT ... SELECT in a
+    single transaction, so either both tables are copied or neither is. A backup
+    table that already holds rows is kept as is, and one left empty by an
+    interrupted run is filled on the next run.
+    """
     print("Creating backup of old analysis result tables...")
     
     main_db = SessionLocal()
     try:
-        # Create backup tables
-        main_db.execute(text("""
-            CREATE TABLE IF NOT EXISTS analysis_results_backup AS 
-            SELECT * FROM analysis_results
-        """))
+        # Create empty backup tables with the columns of the old tables
+        for source_table, backup_table in BACKUP_TABLES:
+            main_db.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {backup_table} AS 
+                SELECT * FROM {source_table} WHERE 0
+            """))
         
-        main_db.execute(text("""
-            CREATE TABLE IF NOT EXISTS analysis_result_details_backup AS 
-            SELECT * FROM analysis_result_details
-        """))
+        # Copy the rows into backup tables that are still empty
+        for source_table, backup_table in BACKUP_TABLES:
+            main_db.execute(text(f"""
+                INSERT INTO {backup_table} 
+                SELECT * FROM {source_table} 
+                WHERE NOT EXISTS (SELECT 1 FROM {backup_table})
+            """))
         
         main_db.commit()
         print("✓ Backup tables created")
@@ -13,7 +13,6 @@ backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 from app.models.database import DATABASE_URL
 
 def migrate_dataset_type():
@@ -21,12 +20,12 @@ def migrate_dataset_type():
     
     # Create database connection
     engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
     print("Starting dataset_type migration...")
     
     try:
-        with engine.connect() as connection:
+        # One transaction for the whole migration, committed when the block exits
+        with engine.begin() as connection:
             # Check if dataset_type column already exists
             result = connection.execute(text("""
                 SELECT COUNT(*) as count 
@@ -42,20 +41,12 @@ def migrate_dataset_type():
             
             print("Adding dataset_type column to datasets table...")
             
-            # Add the dataset_type column with default value 'input'
+            # Add the dataset_type column; the default fills it in for existing rows
             connection.execute(text("""
                 ALTER TABLE datasets 
                 ADD COLUMN dataset_type VARCHAR(20) DEFAULT 'input' NOT NULL
             """))
             
-            # Update any existing NULL values to 'input' (shouldn't be any, but just in case)
-            connection.execute(text("""
-                UPDATE datasets 
-                SET dataset_type = 'input' 
-                WHERE dataset_type IS NULL
-            """))
-            
-            connection.commit()
             print("Successfully added dataset_type column to datasets table.")
             
             # Verify the migration
@@ -15,6 +15,8 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+from app.models.database import SQLITE_BULK_PRAGMAS, SQLITE_WAL_PRAGMA
+
 def create_histogram_table(db_path: str = "backend/rubrics.db"):
     """Create the dataset_histograms table"""
     
@@ -33,6 +35,16 @@ def create_histogram_table(db_path: str = "backend/rubrics.db"):
             print("✅ Table 'dataset_histograms' already exists. Skipping creation.")
             return True
         
+        # Bulk settings for this connection; WAL journaling is stored in the database
+        # file and stays on after the migration
+        print("ℹ️  Switching the database to WAL journaling (kept after the migration)")
+        for pragma in [SQLITE_WAL_PRAGMA] + SQLITE_BULK_PRAGMAS:
+            cursor.execute(pragma)
+        
+        # sqlite3 runs DDL outside of a transaction unless one is open; create the table
+        # and its indexes in one transaction so they are committed together
+        cursor.execute("BEGIN")
+        
         # Create the dataset_histograms table
         cursor.execute("""
             CREATE TABLE dataset_histograms (
@@ -40,8 +52,8 @@ def create_histogram_table(db_path: str = "backend/rubrics.db"):
                 dataset_id VARCHAR(32) NOT NULL,
                 column_id VARCHAR(32) NOT NULL,
                 bin_count INTEGER NOT NULL,
-                bin_edges TEXT NOT NULL,  -- JSON array of bin edge values
-                bin_counts TEXT NOT NULL, -- JSON array of bin counts
+                bin_edges BLOB NOT NULL,  -- bin edge values, packed little-endian float64
+                bin_counts BLOB NOT NULL, -- bin counts, packed little-endian int64
                 min_value REAL NOT NULL,
                 max_value REAL NOT NULL,
                 total_count INTEGER NOT NULL,
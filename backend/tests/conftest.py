@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Make the app package importable when pytest runs from the repository root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def make_rule(name, column_mapping, ruleset_conditions):
+    """A stand-in for a Rule row with the attributes the engines read"""
+    return SimpleNamespace(
+        id=name,
+        name=name,
+        column_mapping=column_mapping,
+        ruleset_conditions=ruleset_conditions,
+        is_active=True,
+        modified_date=None,
+    )
+
+
+@pytest.fixture
+def dataset():
+    import numpy as np
+    import pandas as pd
+    return pd.DataFrame({
+        'a': [0.1, 0.9, np.nan, 0.6],
+        'b': [5, 1, 2, np.nan],
+        'p': [0.9, 0.1, 0.2, 0.5],
+        'q': [0.1, 0.95, 0.3, 0.5],
+    })
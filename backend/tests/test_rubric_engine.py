@@ -0,0 +1,52 @@
+"""Rubric totals, checked against the totals of the original row-wise engine"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from app.services.rubric_engine import RubricEngine
+from test_rule_engine import CASES
+
+WEIGHTS = {'nan_handling': 1.0, 'and_or': 0.5, 'na_catch_all': 2.0, 'fallback': 1.5, 'no_catch_all': 3.0}
+
+
+def make_rubric():
+    rubric_rules = [
+        SimpleNamespace(rule=CASES[name][0], weight=weight, order_index=index, is_active=True)
+        for index, (name, weight) in enumerate(WEIGHTS.items())
+    ]
+    return SimpleNamespace(id='rubric', name='rubric', rubric_rules=rubric_rules, modified_date=None)
+
+
+def test_weighted_totals(dataset):
+    rubric = make_rubric()
+    results = RubricEngine().execute_rubric_on_dataset(rubric, dataset).sort_index()
+    
+    # Missing rule scores count as 0
+    np.testing.assert_array_equal(results['rubric_RUBRIC_SCORE'], [7.5, 35.5, 0.0, 29.0])
+    assert results['rubric_RUBRIC_SCORE'].dtype == np.float64
+    # Rows are sorted by total score, highest first
+    assert RubricEngine().execute_rubric_on_dataset(rubric, dataset).index.tolist() == [1, 3, 0, 2]
+
+
+def test_no_weights_totals(dataset):
+    rubric = make_rubric()
+    results = RubricEngine().execute_rubric_on_dataset_no_weights(rubric, dataset).sort_index()
+    
+    # Rule scores are summed without weights; missing scores count as 0
+    np.testing.assert_array_equal(results['rubric_RUBRIC_SCORE'], [8.0, 19.0, 0.0, 12.0])
+    np.testing.assert_array_equal(results['na_catch_all_SCORE'], [0.0, 3.0, 0.0, 3.0])
+    for column in [f"{name}_SCORE" for name in WEIGHTS] + ['rubric_RUBRIC_SCORE']:
+        assert results[column].dtype == np.float64, column
+
+
+def test_no_weights_top_n(dataset):
+    rubric = make_rubric()
+    results = RubricEngine().execute_rubric_on_dataset_no_weights(rubric, dataset, top_n=2)
+    assert results.index.tolist() == [1, 3]
+
+
+def test_dataset_is_not_modified(dataset):
+    original = dataset.copy()
+    RubricEngine().execute_rubric_on_dataset_no_weights(make_rubric(), dataset)
+    pd.testing.assert_frame_equal(dataset, original)
@@ -16,7 +16,6 @@ import {
 ChartJS.register(CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend);
 
 interface ScoreHistogram {
-  bins: number[];
   counts: number[];
   bin_edges: number[];
   valid_count: number;
@@ -77,19 +76,17 @@ export default function ScoreHistogramGrid({ analysisId, scoreColumns }: ScoreHi
   };
 
   const createChartData = (scoreName: string, histogram: ScoreHistogram) => {
-    if (!histogram || histogram.bins.length === 0 || histogram.counts.length === 0) {
+    // Left bin edges; the backend only sends the full edge list
+    const bins = histogram ? histogram.bin_edges.slice(0, -1) : [];
+    if (!histogram || bins.length === 0 || histogram.counts.length === 0) {
       return null;
     }
 
     // Create labels for bins (using bin centers)
-    const labels = histogram.bins.map((bin, index) => {
-      if (index < histogram.bin_edges.length - 1) {
-        const binStart = histogram.bin_edges[index];
-        const binEnd = histogram.bin_edges[index + 1];
-        const binCenter = (binStart + binEnd) / 2;
-        return binCenter.toFixed(2);
-      }
-      return bin.toFixed(2);
+    const labels = bins.map((binStart, index) => {
+      const binEnd = histogram.bin_edges[index + 1];
+      const binCenter = (binStart + binEnd) / 2;
+      return binCenter.toFixed(2);
     });
 
     return {
@@ -296,7 +293,7 @@ export default function ScoreHistogramGrid({ analysisId, scoreColumns }: ScoreHi
                     <div className="text-center">
                       <p className="text-gray-500 font-medium">Bins</p>
                       <p className="font-semibold text-gray-900">
-                        {histogram.bins.length}
+                        {histogram.bin_edges.length - 1}
                       </p>
                     </div>
                     <div className="text-center">